@@ -1,6 +1,8 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
 from pydantic import BaseModel
 import asyncpg
 import os
@@ -8,19 +10,33 @@ import zlib
 import base64
 import subprocess
 import asyncio
-import signal
+import ssl
+import math
+import re
+import heapq
+import hashlib
+import functools
+import inspect
+import time
+import random
+import sys
+import shutil
+from array import array
+from collections import OrderedDict
 from dotenv import load_dotenv
 from typing import Optional, List
-import httpx
-import boto3
+
+# NOTE: boto3, httpx and certifi are imported lazily where they are used. They are
+# slow to import and sit on the Lambda cold-start path otherwise.
 
 
 load_dotenv()
 
 app = FastAPI(title="CarListingVisualization Backend")
 
-# Track active processes for cancellation
-active_processes = {}
+# Running inside AWS Lambda (Mangum handler): no lifespan events, so the DB pool is
+# created on first use and reused across warm invocations of the same container.
+IS_LAMBDA = bool(os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
 
 # CORS configuration
 app.add_middleware(
@@ -31,6 +47,203 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression: zstd and brotli when the optional `zstandard`/`brotli` packages are
+# installed, gzip always. Bodies under COMPRESSION_MIN_SIZE are sent as is, bodies over
+# COMPRESSION_THREAD_SIZE are compressed in a worker thread so the event loop keeps serving.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_THREAD_SIZE = 64 * 1024
+_compressors: Optional[dict] = None
+
+
+def get_compressors() -> dict:
+    """Content-Encoding -> compress function, in order of preference."""
+    global _compressors
+    if _compressors is None:
+        import gzip
+        compressors = {}
+        try:
+            import zstandard
+            compressors['zstd'] = lambda data: zstandard.ZstdCompressor(level=6).compress(data)
+        except ImportError:
+            pass
+        try:
+            import brotli
+            compressors['br'] = lambda data: brotli.compress(data, quality=5)
+        except ImportError:
+            pass
+        compressors['gzip'] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+        _compressors = compressors
+    return _compressors
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred available encoding the client accepts (q > 0), or None."""
+    accepted = set()
+    for part in (accept_encoding or '').lower().split(','):
+        token, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip())
+    for encoding in get_compressors():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
+
+
+async def compress_body(body: bytes, encoding: str) -> bytes:
+    compress = get_compressors()[encoding]
+    if len(body) >= COMPRESSION_THREAD_SIZE:
+        return await asyncio.to_thread(compress, body)
+    return compress(body)
+
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses for clients that accept it.
+
+    Streaming responses (server-sent events, progress streams) and responses that already
+    carry a Content-Encoding, such as precompressed cache hits, pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+            passthrough = True
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if (message.get('more_body') or len(body) < COMPRESSION_MIN_SIZE or 'content-encoding' in headers
+                    or headers.get('content-type', '').startswith('text/event-stream')):
+                await send(start)
+                await send(message)
+                return
+            body = await compress_body(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+app.add_middleware(CompressionMiddleware)
+
+# JSON bodies of hot GET responses (reference data, listing pages), stored with their compressed
+# variants so a cache hit costs neither a query, JSON encoding nor compression.
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+REFERENCE_CACHE_SECONDS = int(os.getenv('REFERENCE_CACHE_SECONDS', '300'))
+LISTING_PAGE_CACHE_SECONDS = int(os.getenv('LISTING_PAGE_CACHE_SECONDS', '5'))
+
+
+class ResponseCache:
+    """LRU of cached responses bounded by the total size of bodies and compressed variants."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.nbytes = 0
+
+    def get(self, key) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires'] <= time.monotonic():
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, body: bytes, ttl_seconds: float) -> dict:
+        if key in self.entries:
+            self._drop(key)
+        entry = {'key': key, 'body': body, 'variants': {}, 'expires': time.monotonic() + ttl_seconds}
+        self.entries[key] = entry
+        self.nbytes += len(body)
+        self._evict()
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.nbytes -= len(entry['body']) + sum(len(v) for v in entry['variants'].values())
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            self._drop(next(iter(self.entries)))
+
+    async def respond(self, entry: dict, accept_encoding: Optional[str]) -> Response:
+        body = entry['body']
+        encoding = choose_encoding(accept_encoding) if len(body) >= COMPRESSION_MIN_SIZE else None
+        if encoding is None:
+            return Response(body, media_type='application/json')
+        variant = entry['variants'].get(encoding)
+        if variant is None:
+            variant = await compress_body(body, encoding)
+            # Large bodies compress in a thread: only keep the variant if the entry was not
+            # evicted, expired or cleared in the meantime, so nbytes counts cached bytes only
+            if self.entries.get(entry['key']) is entry and entry['variants'].setdefault(encoding, variant) is variant:
+                self.nbytes += len(variant)
+                self._evict()
+        return Response(variant, media_type='application/json',
+                        headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+def cached_json(ttl_seconds: int):
+    """Serve a GET endpoint's JSON through response_cache, keyed by path and parameters.
+
+    The endpoint is called on a miss only; empty results (including the [] endpoints
+    return on DB errors) are not cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(request: Request, **kwargs):
+            if ttl_seconds <= 0:
+                return await func(**kwargs)
+            key = (request.url.path, tuple(sorted(kwargs.items())))
+            entry = response_cache.get(key)
+            if entry is None:
+                data = await func(**kwargs)
+                if not data or isinstance(data, Response):
+                    return data
+                entry = response_cache.put(key, JSONResponse(data).body, ttl_seconds)
+            return await response_cache.respond(entry, request.headers.get('accept-encoding'))
+
+        request_param = inspect.Parameter('request', inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)
+        wrapper.__signature__ = signature.replace(parameters=[request_param, *signature.parameters.values()])
+        return wrapper
+    return decorator
+
 # PostgreSQL connection pool - credentials from environment variables only
 pg_config = {
     'host': os.getenv('PGHOST'),
@@ -40,19 +253,40 @@ pg_config = {
     'password': os.getenv('PGPASSWORD')
 }
 
-# If password is a Secrets Manager ARN, fetch the actual password
-if pg_config['password'] and pg_config['password'].startswith('arn:aws:secretsmanager:'):
-    import boto3
-    import json
-    try:
-        client = boto3.client('secretsmanager')
-        response = client.get_secret_value(SecretId=pg_config['password'])
-        secret = json.loads(response['SecretString'])
-        pg_config['password'] = secret['password']
-        print("✅ Retrieved database password from Secrets Manager", flush=True)
-    except Exception as e:
-        print(f"❌ Failed to retrieve password from Secrets Manager: {e}", flush=True)
-        pg_config['password'] = None
+# Pool sizing. A Lambda container serves one request at a time, so it only needs a couple of connections.
+# With several worker processes (`uvicorn --workers N`, or WEB_CONCURRENCY which uvicorn and gunicorn
+# also read), PG_CONNECTION_BUDGET is split between them instead of each opening its own full-size pool.
+def _cli_workers() -> Optional[int]:
+    """The --workers/-w value of the server command line (worker processes inherit the parent's argv)."""
+    argv = sys.argv
+    for i, arg in enumerate(argv[1:], 1):
+        if arg in ('--workers', '-w') and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith('--workers='):
+            value = arg.split('=', 1)[1]
+        else:
+            continue
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+WEB_WORKERS = max(1, _cli_workers() or int(os.getenv('WEB_CONCURRENCY', '1')))
+PG_CONNECTION_BUDGET = int(os.getenv('PG_CONNECTION_BUDGET', '20'))
+PG_POOL_MAX_SIZE = int(os.getenv('PG_POOL_MAX_SIZE') or (2 if IS_LAMBDA else max(2, PG_CONNECTION_BUDGET // WEB_WORKERS)))
+# Warm set: connections opened in parallel when the pool is created, before the worker reports ready
+PG_POOL_MIN_SIZE = min(PG_POOL_MAX_SIZE, int(os.getenv('PG_POOL_MIN_SIZE') or (1 if IS_LAMBDA else 4)))
+
+# Connection lifecycle: every PG_HEALTH_CHECK_SECONDS the pool is pinged (a failed ping drops all
+# connections, e.g. after an RDS failover) and connections older than PG_CONN_MAX_AGE_SECONDS are
+# replaced and the warm set reopened. Failed pool creation is retried with jittered exponential backoff.
+PG_HEALTH_CHECK_SECONDS = float(os.getenv('PG_HEALTH_CHECK_SECONDS', '15'))
+PG_CONN_MAX_AGE_SECONDS = float(os.getenv('PG_CONN_MAX_AGE_SECONDS', '3600'))
+PG_RETRY_BASE_SECONDS = 0.5
+PG_RETRY_MAX_SECONDS = float(os.getenv('PG_RETRY_MAX_SECONDS', '30'))
+PG_APPLICATION_NAME = os.getenv('PG_APPLICATION_NAME', 'car-listing-backend')
 
 # Required environment variables for DB connectivity
 required_vars = ['PGHOST', 'PGDATABASE', 'PGUSER', 'PGPASSWORD']
@@ -60,21 +294,64 @@ required_vars = ['PGHOST', 'PGDATABASE', 'PGUSER', 'PGPASSWORD']
 # Track background DB init task
 db_init_task: Optional[asyncio.Task] = None
 
+# Set once the Secrets Manager lookup (if any) has succeeded; cached for the process/container lifetime
+_pg_password_resolved = False
+
+
+def resolve_pg_password() -> Optional[str]:
+    """Resolve PGPASSWORD, fetching it from Secrets Manager when it is an ARN.
+
+    The lookup happens at most once per process (or warm Lambda container); a failed
+    lookup is not cached so the next pool init attempt retries it.
+    """
+    global _pg_password_resolved
+    if _pg_password_resolved:
+        return pg_config['password']
+    password = pg_config['password']
+    if password and password.startswith('arn:aws:secretsmanager:'):
+        import boto3
+        import json
+        try:
+            client = boto3.client('secretsmanager')
+            response = client.get_secret_value(SecretId=password)
+            secret = json.loads(response['SecretString'])
+            pg_config['password'] = secret['password']
+            print("✅ Retrieved database password from Secrets Manager", flush=True)
+        except Exception as e:
+            print(f"❌ Failed to retrieve password from Secrets Manager: {e}", flush=True)
+            return None
+    _pg_password_resolved = True
+    return pg_config['password']
+
+
+# RDS CA bundle shipped with the code (backend/certs); /app/certs in the container image
+BUNDLED_CA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'certs', 'rds-global-bundle.pem')
+
+
+def _is_valid_pem(path: str) -> bool:
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+        with open(path, 'r') as f:
+            content = f.read()
+        return '-----BEGIN CERTIFICATE-----' in content and '-----END CERTIFICATE-----' in content
+    except Exception:
+        return False
+
+
 def ensure_rds_ca_file():
+    # Prefer the bundled CA file: no network I/O (and the only option on Lambda's read-only filesystem)
+    if _is_valid_pem(BUNDLED_CA_FILE):
+        return BUNDLED_CA_FILE
     ca_file = "/app/certs/rds-global-bundle.pem"
+    if os.path.exists(ca_file) and _is_valid_pem(ca_file):
+        return ca_file
+    if IS_LAMBDA:
+        print(f"⚠️  RDS CA bundle not found at {BUNDLED_CA_FILE}; not downloading on Lambda", flush=True)
+        return None
     os.makedirs("/app/certs", exist_ok=True)
-    if os.path.exists(ca_file) and os.path.getsize(ca_file) > 0:
-        # Check if it's a valid PEM file (basic check)
-        try:
-            with open(ca_file, 'r') as f:
-                content = f.read()
-                if '-----BEGIN CERTIFICATE-----' in content and '-----END CERTIFICATE-----' in content:
-                    return ca_file
-        except:
-            pass
     # Download
     import urllib.request
-    import time
     print("Downloading RDS CA bundle...", flush=True)
     for i in range(5):
         try:
@@ -87,90 +364,415 @@ def ensure_rds_ca_file():
     print("Failed to download RDS CA bundle after 5 attempts", flush=True)
     return None
 
-import ssl
 
-# Enable SSL for remote connections and create SSL context
+# Enable SSL for remote connections (the SSL context itself is built lazily, see get_ssl_context)
 PG_SSL_VERIFY = os.getenv('PGSSLVERIFY', 'true').lower() not in ('0', 'false', 'no')
-if pg_config['host'] not in ['localhost', '127.0.0.1']:
-    if PG_SSL_VERIFY:
-        # If user provided a root CA file (PGSSLROOTCERT), use it
-        ssl_cafile = os.getenv('PGSSLROOTCERT')
-        if ssl_cafile:
-            if os.path.exists(ssl_cafile):
-                try:
-                    SSL_CONTEXT = ssl.create_default_context(cafile=ssl_cafile)
-                except Exception as e:
-                    print(f"⚠️  Failed to load SSL CA file {ssl_cafile}: {e}", flush=True)
-                    # Try to download and reload
-                    if ensure_rds_ca_file():
-                        try:
-                            SSL_CONTEXT = ssl.create_default_context(cafile=ssl_cafile)
-                        except Exception as e2:
-                            print(f"⚠️  Still failed to load SSL CA file after download: {e2}", flush=True)
-                            SSL_CONTEXT = ssl.create_default_context()
-                    else:
-                        SSL_CONTEXT = ssl.create_default_context()
-            else:
-                # File doesn't exist, try to download
-                if ensure_rds_ca_file():
-                    try:
-                        SSL_CONTEXT = ssl.create_default_context(cafile=ssl_cafile)
-                    except Exception as e:
-                        print(f"⚠️  Failed to load downloaded SSL CA file: {e}", flush=True)
-                        SSL_CONTEXT = ssl.create_default_context()
-                else:
-                    SSL_CONTEXT = ssl.create_default_context()
-        else:
-            # Prefer certifi bundle if available, fall back to system default
-            try:
-                import certifi
-                SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
-            except Exception:
-                SSL_CONTEXT = ssl.create_default_context()
-    else:
+
+_ssl_context_built = False
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def _build_ssl_context() -> Optional[ssl.SSLContext]:
+    if pg_config['host'] in ['localhost', '127.0.0.1']:
+        return None
+    if not PG_SSL_VERIFY:
         # Insecure: do not verify certificate (for testing environments with self-signed certs)
-        SSL_CONTEXT = ssl.SSLContext()
-        SSL_CONTEXT.check_hostname = False
-        SSL_CONTEXT.verify_mode = ssl.CERT_NONE
-else:
-    SSL_CONTEXT = None
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+    # If user provided a root CA file (PGSSLROOTCERT), use it
+    ssl_cafile = os.getenv('PGSSLROOTCERT')
+    if ssl_cafile:
+        if os.path.exists(ssl_cafile):
+            try:
+                return ssl.create_default_context(cafile=ssl_cafile)
+            except Exception as e:
+                print(f"⚠️  Failed to load SSL CA file {ssl_cafile}: {e}", flush=True)
+        # Missing or unreadable: fall back to the bundled (or downloaded) RDS CA file
+        fallback = ensure_rds_ca_file()
+        if fallback:
+            try:
+                return ssl.create_default_context(cafile=fallback)
+            except Exception as e:
+                print(f"⚠️  Failed to load SSL CA file {fallback}: {e}", flush=True)
+        if IS_LAMBDA:
+            # The system store has no RDS CA, so verification would fail on every connect
+            raise RuntimeError(f"No RDS CA bundle: {ssl_cafile} is missing and {BUNDLED_CA_FILE} is not a valid PEM file")
+        return ssl.create_default_context()
+    if IS_LAMBDA and _is_valid_pem(BUNDLED_CA_FILE):
+        return ssl.create_default_context(cafile=BUNDLED_CA_FILE)
+    # Prefer certifi bundle if available, fall back to system default
+    try:
+        import certifi
+        return ssl.create_default_context(cafile=certifi.where())
+    except Exception:
+        return ssl.create_default_context()
+
 
-# Async connection pool (initialized on startup)
+def get_ssl_context() -> Optional[ssl.SSLContext]:
+    """Return the DB SSL context, building it on first use and caching it for the process lifetime."""
+    global _ssl_context, _ssl_context_built
+    if not _ssl_context_built:
+        _ssl_context = _build_ssl_context()
+        _ssl_context_built = True
+    return _ssl_context
+
+
+# Async connection pool (initialized on startup, or on first request when running on Lambda)
 pool: Optional[asyncpg.pool.Pool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+async def pg_connect_kwargs() -> dict:
+    """Connection settings shared by the pool and dedicated connections (e.g. LISTEN)."""
+    # Secrets Manager and CA file loading are blocking; keep them off the event loop
+    password = await asyncio.to_thread(resolve_pg_password)
+    ssl_context = await asyncio.to_thread(get_ssl_context)
+    return {
+        'host': pg_config['host'],
+        'port': pg_config['port'],
+        'user': pg_config['user'],
+        'password': password,
+        'database': pg_config['database'],
+        'ssl': ssl_context,
+        # JIT compilation only slows down the short queries this API runs
+        'server_settings': {'application_name': PG_APPLICATION_NAME, 'jit': 'off'},
+    }
+
+
+async def _init_connection(conn):
+    """Pool `init` hook: prepare the hot statements on every new connection.
+
+    Running them once with arguments that match nothing puts them in asyncpg's
+    per-connection statement cache, so no request pays for parsing and planning them.
+    """
+    await conn.fetch(HYDRATE_LISTINGS_SQL, [])
+    await conn.fetch(LISTING_BY_ID_SQL, -1)
+
+
+# Set when the pool is created and its warm set is open; cleared while health checks fail
+# (reported by /api/ready, which only fails before the first warm-up)
+pool_healthy = False
+pool_recycled_at = 0.0
+
 
 async def _init_db_pool_once():
-    global pool
+    global pool, pool_healthy, pool_recycled_at
     pool = await asyncpg.create_pool(
-        host=pg_config['host'],
-        port=pg_config['port'],
-        user=pg_config['user'],
-        password=pg_config['password'],
-        database=pg_config['database'],
-        min_size=1,
-        max_size=20,
-        ssl=SSL_CONTEXT
+        **await pg_connect_kwargs(),
+        min_size=PG_POOL_MIN_SIZE,
+        max_size=PG_POOL_MAX_SIZE,
+        init=_init_connection,
+        # asyncpg hands out connections LIFO, so with its default (close after 300s idle) light
+        # traffic would let most of the warm set lapse; _pool_maintenance_loop recycles by age
+        max_inactive_connection_lifetime=0
+    )
+    pool_healthy = True
+    pool_recycled_at = time.monotonic()
+
+
+async def _warm_pool():
+    """(Re)open the warm set in parallel by acquiring that many connections at once."""
+    conns = await asyncio.gather(
+        *(pool.acquire(timeout=30) for _ in range(PG_POOL_MIN_SIZE)), return_exceptions=True
     )
+    for conn in conns:
+        if not isinstance(conn, BaseException):
+            await pool.release(conn)
+
+
+async def _pool_maintenance_loop():
+    """Ping the pool, drop its connections when the ping fails and recycle them by age."""
+    global pool_healthy, pool_recycled_at
+    while True:
+        await asyncio.sleep(PG_HEALTH_CHECK_SECONDS)
+        if pool is None:
+            continue
+        try:
+            await pool.fetchval("SELECT 1", timeout=5)
+            if not pool_healthy:
+                print("✅ DB health check passed again", flush=True)
+            pool_healthy = True
+        except Exception as e:
+            if pool_healthy:
+                print(f"⚠️  DB health check failed: {e}; reconnecting", flush=True)
+            pool_healthy = False
+            await pool.expire_connections()
+            continue
+        if time.monotonic() - pool_recycled_at >= PG_CONN_MAX_AGE_SECONDS:
+            # Expired connections are closed on release and reopened on their next acquire
+            await pool.expire_connections()
+            pool_recycled_at = time.monotonic()
+            try:
+                await _warm_pool()
+            except Exception as e:
+                print(f"⚠️  Reopening the DB warm set failed: {e}", flush=True)
+
+
+async def ensure_db_pool() -> Optional[asyncpg.pool.Pool]:
+    """Create the pool on first use (Lambda, where startup events do not run).
+
+    Concurrent callers share a single initialization; a failure leaves `pool` as None
+    so the next request tries again.
+    """
+    global _pool_lock
+    if pool is not None:
+        return pool
+    if any(not os.getenv(var) for var in required_vars):
+        return None
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if pool is None:
+            try:
+                await _init_db_pool_once()
+                print("✅ DB connection pool initialized (on first use)", flush=True)
+            except Exception as e:
+                print(f"⚠️  DB connection failed on first use: {e}", flush=True)
+    return pool
+
+
+def db_not_ready() -> HTTPException:
+    """503 for requests that arrive before the pool is up; clients and the load balancer retry."""
+    return HTTPException(status_code=503, detail="Database not ready", headers={"Retry-After": "2"})
+
+
+async def lazy_db_pool_middleware(request: Request, call_next):
+    if pool is None and request.url.path.startswith('/api/'):
+        await ensure_db_pool()
+    return await call_next(request)
 
 
-async def _retry_db_pool(max_attempts: int = 30, delay_seconds: int = 10):
-    """Retry DB pool initialization in the background without crashing the app."""
-    global pool
+# Only Lambda needs it; elsewhere it would put every request (SSE included) through BaseHTTPMiddleware
+if IS_LAMBDA:
+    app.middleware("http")(lazy_db_pool_middleware)
+
+
+# Multi-worker mode (WEB_WORKERS > 1): the worker holding an flock on SNAPSHOT_DIR/leader.lock is
+# the leader. Only it runs the refresh loops; after each refresh it publishes the structure to
+# SNAPSHOT_DIR (tmpfs where available) as a new generation: arrays as .npy files that the other
+# workers memory-map (the pages are shared, not copied per process), small Python objects as a
+# pickle. Followers load each new generation and take over the lock if the leader exits.
+SNAPSHOT_ENABLED = WEB_WORKERS > 1 and not IS_LAMBDA
+# /dev/shm is used only when it has room for a few generations (Docker's default is 64 MiB)
+SNAPSHOT_MIN_SHM_BYTES = 512 * 2**20
+
+
+def _default_snapshot_dir() -> str:
+    try:
+        if shutil.disk_usage('/dev/shm').free >= SNAPSHOT_MIN_SHM_BYTES:
+            return '/dev/shm/car-listing-snapshot'
+    except OSError:
+        pass
+    return '/tmp/car-listing-snapshot'
+
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR') or _default_snapshot_dir()
+SNAPSHOT_POLL_SECONDS = float(os.getenv('SNAPSHOT_POLL_SECONDS', '2'))
+# How long a follower request waits for the leader's first snapshot before answering 503
+SNAPSHOT_WAIT_SECONDS = 10
+SNAPSHOT_KEEP_GENERATIONS = 2
+_leader_lock_fd: Optional[int] = None
+_published_versions: dict = {}
+
+
+def try_become_leader() -> bool:
+    """Take the leader lock without blocking; the OS releases it when the process exits."""
+    global _leader_lock_fd
+    if _leader_lock_fd is not None:
+        return True
+    import fcntl
+    os.makedirs(SNAPSHOT_DIR, mode=0o700, exist_ok=True)
+    fd = os.open(os.path.join(SNAPSHOT_DIR, 'leader.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return False
+    _leader_lock_fd = fd
+    # Drop generations left by an earlier run; they are republished after the first refresh
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name != 'leader.lock':
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+    return True
+
+
+def publish_snapshot(name: str, arrays: dict, objects) -> str:
+    """Write a new generation of `name` and point SNAPSHOT_DIR/name/CURRENT at it (leader only)."""
+    import numpy as np
+    import pickle
+    base = os.path.join(SNAPSHOT_DIR, name)
+    os.makedirs(base, mode=0o700, exist_ok=True)
+    generation = str(time.time_ns())
+    tmp = os.path.join(base, f".tmp-{generation}")
+    os.mkdir(tmp)
+    try:
+        for key, values in arrays.items():
+            np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(tmp, 'objects.pickle'), 'wb') as f:
+            pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        # E.g. ENOSPC: do not leave a partial generation behind on every retry
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    os.rename(tmp, os.path.join(base, generation))
+    with open(os.path.join(base, '.CURRENT.tmp'), 'w') as f:
+        f.write(generation)
+    os.replace(os.path.join(base, '.CURRENT.tmp'), os.path.join(base, 'CURRENT'))
+    # Older generations can go: files a follower still has mapped stay valid until it unmaps them
+    generations = sorted(d for d in os.listdir(base) if d.isdigit())
+    for stale in generations[:-SNAPSHOT_KEEP_GENERATIONS] + [d for d in os.listdir(base) if d.startswith('.tmp-') and d != f".tmp-{generation}"]:
+        shutil.rmtree(os.path.join(base, stale), ignore_errors=True)
+    return generation
+
+
+def current_snapshot(name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, name, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(name: str, generation: str):
+    """Memory-map the arrays of a published generation (read-only) and unpickle its objects."""
+    import numpy as np
+    import pickle
+    base = os.path.join(SNAPSHOT_DIR, name, generation)
+    arrays = {}
+    for file_name in os.listdir(base):
+        if file_name.endswith('.npy'):
+            path = os.path.join(base, file_name)
+            try:
+                values = np.load(path, mmap_mode='r')
+            except ValueError:
+                # Empty arrays cannot be mapped
+                values = np.load(path)
+            arrays[file_name[:-4]] = np.asarray(values)
+    with open(os.path.join(base, 'objects.pickle'), 'rb') as f:
+        objects = pickle.load(f)
+    return arrays, objects
+
+
+def is_snapshot_follower() -> bool:
+    return SNAPSHOT_ENABLED and _leader_lock_fd is None
+
+
+async def wait_for_snapshot(component) -> bool:
+    """Follower: wait for the leader's snapshot of `component` instead of refreshing it here.
+
+    Returns whether the component is ready (False right away on the leader or in single-process
+    mode, where the caller refreshes it); raises 503 if no snapshot arrives in time.
+    """
+    deadline = time.monotonic() + SNAPSHOT_WAIT_SECONDS
+    while is_snapshot_follower() and not component.ready:
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=503, detail="Snapshot not loaded yet", headers={"Retry-After": "2"})
+        await asyncio.sleep(0.1)
+    return component.ready
+
+
+def _snapshot_components() -> dict:
+    return {'listing_index': listing_index, 'price_stats': price_stats,
+            'suggest': suggest_index, 'analytics': analytics_rollups, 'reference': reference_data}
+
+
+async def share_snapshot(name: str):
+    """Publish a component after the leader refreshed it; a no-op in single-process mode."""
+    if not SNAPSHOT_ENABLED or _leader_lock_fd is None:
+        return
+    component = _snapshot_components()[name]
+    version = component.version
+    if not component.ready or _published_versions.get(name) == version:
+        return
+    arrays, objects = component.snapshot()
+    await asyncio.to_thread(publish_snapshot, name, arrays, objects)
+    _published_versions[name] = version
+
+
+async def _snapshot_follow_loop():
+    """Follower: swap in each newly published generation; become leader if the lock frees up."""
+    loaded = {}
+    while True:
+        if try_become_leader():
+            print(f"✅ Worker {os.getpid()} is now the snapshot leader", flush=True)
+            _start_refresh_loops()
+            return
+        for name, component in _snapshot_components().items():
+            generation = current_snapshot(name)
+            if generation is None or loaded.get(name) == generation:
+                continue
+            try:
+                arrays, objects = await asyncio.to_thread(load_snapshot, name, generation)
+            except (FileNotFoundError, EOFError) as e:
+                # Replaced while loading; the next poll picks up the newer generation
+                print(f"⚠️  Snapshot {name}/{generation} not loaded: {e}", flush=True)
+                continue
+            component.restore(arrays, objects)
+            loaded[name] = generation
+        await asyncio.sleep(SNAPSHOT_POLL_SECONDS)
+
+
+# Long-running tasks started once the DB pool is available
+background_tasks: List[asyncio.Task] = []
+
+
+def _start_background_tasks():
+    if background_tasks:
+        return
+    if PG_HEALTH_CHECK_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(_pool_maintenance_loop()))
+    listing_feed.install_task = asyncio.create_task(listing_feed.install_triggers())
+    background_tasks.append(listing_feed.install_task)
+    if SNAPSHOT_ENABLED and not try_become_leader():
+        print(f"✅ Worker {os.getpid()} follows the snapshot leader", flush=True)
+        background_tasks.append(asyncio.create_task(_snapshot_follow_loop()))
+        return
+    if SNAPSHOT_ENABLED:
+        print(f"✅ Worker {os.getpid()} is the snapshot leader", flush=True)
+    _start_refresh_loops()
+
+
+def _start_refresh_loops():
+    # With a refresh interval of 0 the component loads on first request; the snapshot leader
+    # still loads it once up front (the loop returns after one refresh) so followers get a copy
+    if LISTING_INDEX_ENABLED:
+        background_tasks.append(asyncio.create_task(_listing_index_loop()))
+    if SNAPSHOT_ENABLED:
+        background_tasks.append(asyncio.create_task(_reference_data_loop()))
+    if PRICE_STATS_REFRESH_SECONDS > 0 or SNAPSHOT_ENABLED:
+        background_tasks.append(asyncio.create_task(_price_stats_loop()))
+    if SUGGEST_REFRESH_SECONDS > 0 or SNAPSHOT_ENABLED:
+        background_tasks.append(asyncio.create_task(_suggest_index_loop()))
+    if ANALYTICS_REFRESH_SECONDS > 0 or SNAPSHOT_ENABLED:
+        background_tasks.append(asyncio.create_task(_analytics_loop()))
+
+
+async def _retry_db_pool(max_attempts: int = 30):
+    """Retry DB pool initialization in the background without crashing the app.
+
+    Waits grow exponentially from PG_RETRY_BASE_SECONDS up to PG_RETRY_MAX_SECONDS, with
+    jitter so that workers restarted together do not reconnect in lockstep.
+    """
     for attempt in range(1, max_attempts + 1):
         if pool is not None:
             return
         try:
             await _init_db_pool_once()
             print("✅ DB connection pool initialized (retry)", flush=True)
+            _start_background_tasks()
             return
         except Exception as e:
-            print(f"⚠️  DB connection failed (attempt {attempt}/{max_attempts}): {e}", flush=True)
-            await asyncio.sleep(delay_seconds)
+            delay = min(PG_RETRY_MAX_SECONDS, PG_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            print(f"⚠️  DB connection failed (attempt {attempt}/{max_attempts}, retrying in {delay:.1f}s): {e}", flush=True)
+            await asyncio.sleep(delay)
     print("⚠️  DB connection failed after retries; running without DB pool", flush=True)
 
 
 @app.on_event("startup")
 async def startup():
-    global pool, db_init_task
+    global db_init_task
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
         print(f"⚠️  Missing required DB environment variables: {', '.join(missing_vars)}", flush=True)
@@ -179,6 +781,7 @@ async def startup():
     try:
         await _init_db_pool_once()
         print("✅ DB connection pool initialized", flush=True)
+        _start_background_tasks()
     except Exception as e:
         print(f"⚠️  DB connection failed on startup: {e}", flush=True)
         if db_init_task is None or db_init_task.done():
@@ -186,7 +789,7 @@ async def startup():
 
     # Log SSL verification status at startup
     try:
-        if SSL_CONTEXT is None:
+        if get_ssl_context() is None:
             print("🔒 DB SSL: not used (local host)", flush=True)
         elif PG_SSL_VERIFY:
             print("🔒 DB SSL verification: ENABLED (using certifi/system CA)", flush=True)
@@ -225,10 +828,18 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
-    global pool
+    global pool, _process_pool
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    if listing_feed.task is not None:
+        listing_feed.task.cancel()
     if pool:
         await pool.close()
         pool = None
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
 
 
 def decompress_description(b64: str) -> Optional[str]:
@@ -251,68 +862,660 @@ def decompress_description(b64: str) -> Optional[str]:
         return b64
 
 
+def compress_description(text: Optional[str]) -> Optional[str]:
+    """Compress listing description to base64+zlib (inverse of decompress_description)."""
+    if not text:
+        return None
+    return base64.b64encode(zlib.compress(text.encode('utf-8'))).decode('ascii')
+
+
+# Shared process pool for CPU-bound batch work (ingest parsing/compression, duplicate fingerprinting)
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', str(os.cpu_count() or 2)))
+_process_pool = None
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _process_pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _process_pool
+
+
+async def run_in_process_pool(func, items: list, start: int = 0) -> list:
+    """Split items into one chunk per worker and run func(chunk, offset) on each in parallel.
+
+    `offset` is the position of the chunk's first item plus `start`; results are
+    returned in chunk order.
+    """
+    if not items:
+        return []
+    loop = asyncio.get_running_loop()
+    executor = get_process_pool()
+    size = max(1, -(-len(items) // WORKER_PROCESSES))
+    return await asyncio.gather(*(
+        loop.run_in_executor(executor, func, items[i:i + size], start + i)
+        for i in range(0, len(items), size)
+    ))
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event with a JSON payload."""
+    import json
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @app.get("/")
 def root():
     return {"message": "CarListingVisualization backend"}
 
 
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 503 until the DB pool and its warm set have opened, then 200.
+
+    Point the load balancer health check here so a worker only gets traffic once it can serve it.
+    Later DB outages are reported as `db_healthy: false` but stay 200: an outage affects every
+    task alike, and failing the check would only make ECS replace them all.
+    """
+    if pool is None:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {
+        "ready": True,
+        "db_healthy": pool_healthy,
+        "pool": {"size": pool.get_size(), "idle": pool.get_idle_size(), "max": pool.get_max_size()},
+    }
+
+
+async def fetch_stats(conn) -> dict:
+    """Total listings and cars; estimated counts if COUNT(*) fails or times out."""
+    try:
+        # Fail fast if COUNT(*) would take too long (5s)
+        await conn.execute("SET LOCAL statement_timeout = 5000")
+        total_listings = await conn.fetchval("SELECT COUNT(*) FROM listings")
+        total_cars = await conn.fetchval("SELECT COUNT(*) FROM cars")
+        return {"total_listings": total_listings, "total_cars": total_cars}
+    except Exception as e:
+        # Fallback to estimated counts
+        try:
+            est_listings = await conn.fetchval("SELECT COALESCE(reltuples::bigint,0) FROM pg_class WHERE relname = 'listings'")
+            est_cars = await conn.fetchval("SELECT COALESCE(reltuples::bigint,0) FROM pg_class WHERE relname = 'cars'")
+            return {
+                "total_listings": int(est_listings or 0),
+                "total_cars": int(est_cars or 0),
+                "note": "estimated counts due to DB timeout/error"
+            }
+        except Exception:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Reference lists and the /api/stats counts in multi-worker mode: the snapshot leader reloads
+# them every REFERENCE_REFRESH_SECONDS and followers serve its copy, so the workers do not each
+# query them (/api/stats runs two COUNT(*)s). A single process keeps querying on demand.
+REFERENCE_REFRESH_SECONDS = int(os.getenv('REFERENCE_REFRESH_SECONDS', '60'))
+
+
+class ReferenceData:
+    """Makes, models, drives, transmissions and listing/car counts, as the endpoints return them."""
+
+    def __init__(self):
+        self.data: Optional[dict] = None
+        # Bumped only when the data changed, so unchanged reloads are not republished
+        self.version = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.data is not None
+
+    def snapshot(self):
+        return {}, {'data': self.data, 'version': self.version}
+
+    def restore(self, arrays: dict, objects: dict):
+        self.data, self.version = objects['data'], objects['version']
+
+    async def refresh(self, db_pool):
+        async with db_pool.acquire() as conn:
+            data = {
+                'makes': [{"make_id": r['make_id'], "make_name": r['make_name']}
+                          for r in await conn.fetch("SELECT make_id, make_name FROM makes ORDER BY make_name")],
+                'models': [tuple(r) for r in await conn.fetch(
+                    "SELECT model_id, model_name, make_id FROM models ORDER BY model_name")],
+                'drives': [{"id": r['id'], "name": r['name']} for r in await conn.fetch(
+                    "SELECT drives_id AS id, drives_type AS name FROM drives ORDER BY drives_type")],
+                'transmissions': [{"id": r['id'], "name": r['name']} for r in await conn.fetch(
+                    "SELECT transmission_id AS id, transmission_type AS name FROM transmissions ORDER BY transmission_type")],
+            }
+            data['stats'] = await fetch_stats(conn)
+        if data != self.data:
+            self.data = data
+            self.version += 1
+
+    def models(self, make_id: Optional[int]) -> List[dict]:
+        return [{"model_id": model_id, "model_name": name} for model_id, name, model_make_id in self.data['models']
+                if not make_id or model_make_id == make_id]
+
+
+reference_data = ReferenceData()
+
+
+async def _reference_data_loop():
+    while True:
+        try:
+            await reference_data.refresh(pool)
+            await share_snapshot('reference')
+        except Exception as e:
+            print(f"⚠️  Reference data refresh failed: {e}", flush=True)
+        await asyncio.sleep(REFERENCE_REFRESH_SECONDS)
+
+
 @app.get("/api/stats")
 async def get_stats():
     """Get database statistics: total listings and total cars.
     Uses a short statement_timeout and falls back to estimated counts if needed."""
     if pool is None:
-        raise HTTPException(status_code=500, detail="Database pool not initialized")
+        raise db_not_ready()
+    if reference_data.ready:
+        return reference_data.data['stats']
 
     async with pool.acquire() as conn:
+        return await fetch_stats(conn)
+
+
+# Columns and joins shared by the listings query and the hydration of index results
+LISTING_SELECT = """
+        SELECT 
+            l.listing_id, 
+            l.listing_price, 
+            l.listing_odometer, 
+            d.description_text AS listing_description, 
+            l.listing_vin_id,
+            l.listing_latitude AS listing_lat,
+            l.listing_longitude AS listing_lon,
+            r.region_name AS listing_region, 
+            c.year AS listing_year,
+            mk.make_name || ' ' || md.model_name AS listing_make_model,
+            tr.transmission_type AS listing_transmission_type,
+            dr.drives_type AS listing_drive_type{select_extra}
+        FROM listings l
+        LEFT JOIN cars c ON l.listing_vin_id = c.vin_id
+        LEFT JOIN models md ON c.model_id = md.model_id
+        LEFT JOIN makes mk ON md.make_id = mk.make_id
+        LEFT JOIN drives dr ON c.drives_id = dr.drives_id
+        LEFT JOIN transmissions tr ON c.transmission_id = tr.transmission_id
+        LEFT JOIN regions r ON l.listing_region_id = r.region_id
+        LEFT JOIN descriptions d ON l.listing_description_id = d.description_id
+    """
+HYDRATE_LISTINGS_SQL = LISTING_SELECT.format(select_extra="") + " WHERE l.listing_id = ANY($1::bigint[])"
+
+EARTH_RADIUS = {'mi': 3958.7613, 'km': 6371.0088}
+
+
+def listing_to_dict(row, distance=None, distance_unit: Optional[str] = None) -> dict:
+    """Shape a listing row the way /api/listings returns it."""
+    return {
+        'listing_id': row['listing_id'],
+        'listing_price': row['listing_price'],
+        'listing_odometer': row['listing_odometer'],
+        'listing_description': decompress_description(row['listing_description']),
+        'listing_vin_id': row['listing_vin_id'],
+        'listing_lat': str(row['listing_lat']) if row['listing_lat'] is not None else None,
+        'listing_lon': str(row['listing_lon']) if row['listing_lon'] is not None else None,
+        'listing_region': row['listing_region'],
+        'listing_year': row['listing_year'],
+        'listing_make_model': row['listing_make_model'],
+        'listing_transmission_type': row['listing_transmission_type'],
+        'listing_drive_type': row['listing_drive_type'],
+        'distance': float(distance) if distance is not None else None,
+        'distance_unit': distance_unit
+    }
+
+
+# Optional in-memory columnar index of the filterable listing attributes (LISTING_INDEX=1, needs numpy).
+# Filters, sorting, counts and radius search run as vectorized masks; Postgres only hydrates the page.
+LISTING_INDEX_ENABLED = os.getenv('LISTING_INDEX', 'false').lower() in ('1', 'true', 'yes')
+LISTING_INDEX_REFRESH_SECONDS = int(os.getenv('LISTING_INDEX_REFRESH_SECONDS', '30'))
+LISTING_INDEX_REBUILD_SECONDS = int(os.getenv('LISTING_INDEX_REBUILD_SECONDS', '3600'))
+LISTING_INDEX_FETCH_SIZE = 50000
+# Lat/lon cell size of the grid used for nearest-N search (~35 mi of latitude)
+KNN_CELL_DEGREES = 0.5
+# Listings examined before nearest() trusts its match-rate estimate
+KNN_MIN_SAMPLE = 2000
+
+
+class ListingIndex:
+    """Column arrays over all listings, sorted by listing_id.
+
+    Nullable numeric columns are float32 with NaN (comparisons with NaN are false,
+    like NULL in SQL); id columns use -1 for NULL. About 39 bytes per listing, plus
+    16 per listing with coordinates for the nearest-N grid (~51 MiB per million with
+    90% geocoded), see scripts/bench_listing_index.py.
+    New listings are appended by listing_id watermark; updates to existing
+    listings are picked up by the periodic full rebuild.
+    """
+
+    # name -> (numpy dtype, SQL expression in LISTING_INDEX_QUERY order)
+    COLUMNS = {
+        'ids': ('int64', 'l.listing_id'),
+        'price': ('float32', 'l.listing_price::float8'),
+        'odometer': ('float32', 'l.listing_odometer::float8'),
+        'year': ('int16', 'COALESCE(c.year, -1)'),
+        'make_id': ('int32', 'COALESCE(md.make_id, -1)'),
+        'model_id': ('int32', 'COALESCE(c.model_id, -1)'),
+        'drive': ('int16', 'COALESCE(c.drives_id, -1)'),
+        'transmission': ('int16', 'COALESCE(c.transmission_id, -1)'),
+        'lat': ('float32', 'l.listing_latitude::float8'),
+        'lon': ('float32', 'l.listing_longitude::float8'),
+    }
+
+    def __init__(self):
+        self.cols: Optional[dict] = None
+        self.alive = None
+        self.watermark = 0
+        self.built_at = 0.0
+        # Bumped on every change, so the snapshot leader only republishes a changed index
+        self.version = 0
+        self._grid_cache = None
+
+    @property
+    def ready(self) -> bool:
+        return self.cols is not None
+
+    def __len__(self) -> int:
+        return int(self.alive.sum()) if self.alive is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        if self.cols is None:
+            return 0
+        total = sum(a.nbytes for a in self.cols.values()) + self.alive.nbytes
+        # The nearest-N grid (two int64 arrays over listings with coordinates), once built
+        if self._grid_cache is not None and self._grid_cache[0] is self.cols:
+            cell_sorted, cell_pos, _ = self._grid_cache[1]
+            total += cell_sorted.nbytes + cell_pos.nbytes
+        return total
+
+    @classmethod
+    def query_sql(cls) -> str:
+        return f"""
+            SELECT {', '.join(expr for _, expr in cls.COLUMNS.values())}
+            FROM listings l
+            LEFT JOIN cars c ON l.listing_vin_id = c.vin_id
+            LEFT JOIN models md ON c.model_id = md.model_id
+            WHERE l.listing_id > $1 AND (l.listing_vin_id IS NULL OR length(l.listing_vin_id) <= 17)
+            ORDER BY l.listing_id
+        """
+
+    @classmethod
+    def _to_arrays(cls, records) -> dict:
+        import numpy as np
+        values = list(zip(*records))
+        return {name: np.array(values[i], dtype=dtype) for i, (name, (dtype, _)) in enumerate(cls.COLUMNS.items())}
+
+    def append(self, chunk: dict):
+        """Append column arrays for listings newer than the watermark."""
+        import numpy as np
+        n = len(chunk['ids'])
+        if n == 0:
+            return
+        if self.cols is None:
+            cols, alive = chunk, np.ones(n, dtype=bool)
+        else:
+            cols = {name: np.concatenate([self.cols[name], chunk[name]]) for name in self.COLUMNS}
+            alive = np.concatenate([self.alive, np.ones(n, dtype=bool)])
+        # Swap in complete arrays so a concurrent query never sees a half-updated index
+        self.cols, self.alive = cols, alive
+        self.watermark = int(cols['ids'][-1])
+        self.version += 1
+
+    def remove(self, listing_ids):
+        """Mark deleted listings (e.g. removed duplicates) so they no longer match."""
+        import numpy as np
+        if self.cols is None or not len(listing_ids):
+            return
+        pos = np.searchsorted(self.cols['ids'], np.asarray(listing_ids, dtype=np.int64))
+        pos = pos[pos < len(self.cols['ids'])]
+        pos = pos[np.isin(self.cols['ids'][pos], listing_ids)]
+        alive = self.alive.copy()
+        alive[pos] = False
+        self.alive = alive
+        self.version += 1
+
+    async def _fetch_since(self, conn, watermark: int) -> Optional[dict]:
+        import numpy as np
+        chunks = []
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(self.query_sql(), watermark)
+            while True:
+                records = await cursor.fetch(LISTING_INDEX_FETCH_SIZE)
+                if not records:
+                    break
+                chunks.append(self._to_arrays(records))
+        if not chunks:
+            return None
+        return {name: np.concatenate([c[name] for c in chunks]) for name in self.COLUMNS}
+
+    async def build(self, db_pool):
+        """Full (re)build through a server-side cursor; the old arrays keep serving until the swap."""
+        started = time.perf_counter()
+        async with db_pool.acquire() as conn:
+            chunk = await self._fetch_since(conn, 0)
+        fresh = ListingIndex()
+        if chunk is not None:
+            fresh.append(chunk)
+        self.cols, self.alive, self.watermark = fresh.cols, fresh.alive, fresh.watermark
+        self.built_at = time.time()
+        self.version += 1
+        print(f"✅ Listing index built: {len(self)} listings, {self.nbytes / 1e6:.1f} MB in {time.perf_counter() - started:.1f}s", flush=True)
+
+    async def refresh(self, db_pool):
+        """Append listings added since the watermark."""
+        async with db_pool.acquire() as conn:
+            chunk = await self._fetch_since(conn, self.watermark)
+        if chunk is not None:
+            self.append(chunk)
+
+    def snapshot(self):
+        """(arrays, objects) for the shared snapshot, including the nearest-N grid if built."""
+        arrays = {f"col_{name}": values for name, values in self.cols.items()}
+        arrays['alive'] = self.alive
+        objects = {'watermark': self.watermark, 'built_at': self.built_at, 'grid_cols': None}
+        cached = self._grid_cache
+        if cached is not None and cached[0] is self.cols:
+            arrays['grid_cells'], arrays['grid_pos'], objects['grid_cols'] = cached[1]
+        return arrays, objects
+
+    def restore(self, arrays: dict, objects: dict):
+        cols = {name: arrays[f"col_{name}"] for name in self.COLUMNS}
+        grid = None
+        if objects['grid_cols'] is not None:
+            grid = (cols, (arrays['grid_cells'], arrays['grid_pos'], objects['grid_cols']))
+        self.cols, self.alive, self._grid_cache = cols, arrays['alive'], grid
+        self.watermark, self.built_at = objects['watermark'], objects['built_at']
+        self.version += 1
+
+    def _mask(self, cols, alive, *, min_price=None, max_price=None, make_id=None, model_id=None,
+              min_year=None, max_year=None, min_odometer=None, max_odometer=None,
+              drive=None, transmission=None, with_coords=False, lat_range=None):
+        import numpy as np
+        mask = alive.copy()
+        if min_price is not None:
+            mask &= cols['price'] >= min_price
+        if max_price is not None:
+            mask &= cols['price'] <= max_price
+        if min_odometer is not None:
+            mask &= cols['odometer'] >= min_odometer
+        if max_odometer is not None:
+            mask &= cols['odometer'] <= max_odometer
+        if min_year is not None:
+            mask &= cols['year'] >= min_year
+        if max_year is not None:
+            mask &= (cols['year'] <= max_year) & (cols['year'] >= 0)
+        if make_id is not None:
+            mask &= cols['make_id'] == make_id
+        if model_id is not None:
+            mask &= cols['model_id'] == model_id
+        if drive is not None:
+            mask &= cols['drive'] == drive
+        if transmission is not None:
+            mask &= cols['transmission'] == transmission
+        if with_coords:
+            mask &= ~(np.isnan(cols['lat']) | np.isnan(cols['lon']))
+        if lat_range is not None:
+            mask &= (cols['lat'] >= lat_range[0]) & (cols['lat'] <= lat_range[1])
+        return mask
+
+    @staticmethod
+    def _lat_band(user_lat: float, radius: float, unit: str):
+        # Padding covers float32 rounding of the stored coordinates
+        dlat = math.degrees(radius / EARTH_RADIUS[unit]) + 1e-4
+        return user_lat - dlat, user_lat + dlat
+
+    @staticmethod
+    def _lon_band(cols, idx, user_lat: float, user_lon: float, radius: float, unit: str):
+        """Keep candidates inside the longitude span of the search circle (with the latitude band, a box)."""
+        import numpy as np
+        ang = radius / EARTH_RADIUS[unit]
+        if ang >= math.pi / 2 or abs(user_lat) + math.degrees(ang) >= 90:
+            return idx
+        dlon = math.degrees(math.asin(min(1.0, math.sin(ang) / math.cos(math.radians(user_lat))))) + 1e-4
+        lon = cols['lon'][idx]
+        return idx[np.abs((lon - user_lon + 180) % 360 - 180) <= dlon]
+
+    @staticmethod
+    def distances(lat, lon, user_lat: float, user_lon: float, unit: str):
+        """Great-circle distance with the same spherical law of cosines the SQL query uses."""
+        import numpy as np
+        lat_r = np.radians(lat.astype(np.float64))
+        lon_r = np.radians(lon.astype(np.float64))
+        ulat, ulon = math.radians(user_lat), math.radians(user_lon)
+        cos_c = np.cos(ulat) * np.cos(lat_r) * np.cos(lon_r - ulon) + np.sin(ulat) * np.sin(lat_r)
+        return EARTH_RADIUS[unit] * np.arccos(np.clip(cos_c, -1.0, 1.0))
+
+    def _grid(self, cols):
+        """Positions of listings with coordinates, sorted by KNN_CELL_DEGREES lat/lon cell.
+
+        Built lazily for the current arrays (append swaps in new arrays, which invalidates it).
+        Returns (sorted cell ids, positions, number of cell columns).
+        """
+        import numpy as np
+        cached = self._grid_cache
+        if cached is not None and cached[0] is cols:
+            return cached[1]
+        n_cols = int(round(360 / KNN_CELL_DEGREES))
+        lat, lon = cols['lat'], cols['lon']
+        pos = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        cell = self._cell_row(lat[pos]) * n_cols + self._cell_col(lon[pos], n_cols)
+        order = np.argsort(cell, kind='stable')
+        grid = (cell[order], pos[order], n_cols)
+        self._grid_cache = (cols, grid)
+        return grid
+
+    @staticmethod
+    def _cell_row(lat):
+        import numpy as np
+        n_rows = int(round(180 / KNN_CELL_DEGREES))
+        return np.clip(np.floor((np.asarray(lat, dtype=np.float64) + 90) / KNN_CELL_DEGREES), 0, n_rows - 1).astype(np.int64)
+
+    @staticmethod
+    def _cell_col(lon, n_cols: int):
+        import numpy as np
+        return np.floor((np.asarray(lon, dtype=np.float64) + 180) / KNN_CELL_DEGREES).astype(np.int64) % n_cols
+
+    def nearest(self, *, user_lat: float, user_lon: float, limit: int = 50, offset: int = 0,
+                radius_unit: str = 'mi', **filters):
+        """k-nearest listings matching the filters: (page_ids, page_distances), distance ASC, listing_id DESC.
+
+        Grid cells are searched in rings around the user's cell until the k-th best distance
+        is no larger than the smallest possible distance to any cell not yet searched, so the
+        work depends on local listing density rather than on the total number of listings.
+        """
+        import numpy as np
+        cols, alive = self.cols, self.alive
+        filters.pop('with_coords', None)
+        k = offset + limit
+        cell_sorted, cell_pos, n_cols = self._grid(cols)
+        if not len(cell_pos):
+            return [], []
+        n_rows = int(round(180 / KNN_CELL_DEGREES))
+        ci = int(self._cell_row(user_lat))
+        cj = int(self._cell_col(user_lon, n_cols))
+
+        def cell_range(row, c_lo, c_hi):
+            # Positions in cells (row, c_lo..c_hi) with column wrap-around at the antimeridian
+            if c_hi - c_lo + 1 >= n_cols:
+                spans = [(0, n_cols - 1)]
+            else:
+                a, b = c_lo % n_cols, c_hi % n_cols
+                spans = [(a, b)] if a <= b else [(a, n_cols - 1), (0, b)]
+            for a, b in spans:
+                lo = np.searchsorted(cell_sorted, row * n_cols + a, 'left')
+                hi = np.searchsorted(cell_sorted, row * n_cols + b, 'right')
+                if hi > lo:
+                    yield cell_pos[lo:hi]
+
+        cand_pos, cand_dist = [], []
+        found = examined = 0
+        r = 0
+        while True:
+            parts = []
+            for row in range(ci - r, ci + r + 1):
+                if not 0 <= row < n_rows:
+                    continue
+                if r == 0 or row in (ci - r, ci + r):
+                    parts.extend(cell_range(row, cj - r, cj + r))
+                elif 2 * r - 1 < n_cols:
+                    # Side columns; once the ring spans the globe they meet in one column
+                    parts.extend(cell_range(row, cj - r, cj - r))
+                    if 2 * r < n_cols:
+                        parts.extend(cell_range(row, cj + r, cj + r))
+            if parts:
+                pos = np.concatenate(parts)
+                examined += len(pos)
+                sub = {name: cols[name][pos] for name in self.COLUMNS}
+                pos = pos[self._mask(sub, alive[pos], **filters)]
+                if len(pos):
+                    cand_pos.append(pos)
+                    cand_dist.append(self.distances(cols['lat'][pos], cols['lon'][pos], user_lat, user_lon, radius_unit))
+                    found += len(pos)
+
+            covered = (ci - r <= 0 and ci + r >= n_rows - 1) and 2 * r + 1 >= n_cols
+            if covered:
+                break
+            if found >= k:
+                kth = np.partition(np.concatenate(cand_dist), k - 1)[k - 1]
+                if kth <= self._outside_bound(user_lat, user_lon, ci, cj, r, n_cols, radius_unit):
+                    break
+            # Sparse matches (e.g. a rare model): once the match rate seen so far says reaching k
+            # would touch a quarter of the index, one vectorized pass over everything is cheaper
+            if examined > len(cell_pos) // 4 or (
+                    examined >= KNN_MIN_SAMPLE and k * examined > max(found, 1) * (len(cell_pos) // 4)):
+                return self._nearest_scan(cols, alive, user_lat, user_lon, limit, offset, radius_unit, filters)
+            r += 1
+
+        if not cand_pos:
+            return [], []
+        pos = np.concatenate(cand_pos)
+        dist = np.concatenate(cand_dist)
+        order = np.lexsort((-cols['ids'][pos], dist))[offset:offset + limit]
+        return cols['ids'][pos[order]].tolist(), dist[order].tolist()
+
+    @staticmethod
+    def _outside_bound(user_lat, user_lon, ci, cj, r, n_cols, unit):
+        """Lower bound on the distance from the user to any point outside the searched cell block."""
+        lat_lo = (ci - r) * KNN_CELL_DEGREES - 90
+        lat_hi = (ci + r + 1) * KNN_CELL_DEGREES - 90
+        d_lat = min(user_lat - lat_lo if lat_lo > -90 else math.inf, lat_hi - user_lat if lat_hi < 90 else math.inf)
+        bound = math.radians(d_lat)
+        if 2 * r + 1 < n_cols:
+            lon_lo = (cj - r) * KNN_CELL_DEGREES - 180
+            lon_hi = (cj + r + 1) * KNN_CELL_DEGREES - 180
+            # Distance to the nearest meridian bounding the block: sin(d) = cos(lat) * sin(dlon)
+            d_lon = math.radians(min(90.0, (user_lon + 180) % 360 - 180 - lon_lo, lon_hi - ((user_lon + 180) % 360 - 180)))
+            bound = min(bound, math.asin(math.cos(math.radians(user_lat)) * math.sin(max(0.0, d_lon))))
+        return EARTH_RADIUS[unit] * bound
+
+    def _nearest_scan(self, cols, alive, user_lat, user_lon, limit, offset, unit, filters):
+        import numpy as np
+        idx = np.flatnonzero(self._mask(cols, alive, with_coords=True, **filters))
+        dist = self.distances(cols['lat'][idx], cols['lon'][idx], user_lat, user_lon, unit)
+        k = min(offset + limit, len(idx))
+        if k == 0:
+            return [], []
+        if k < len(idx):
+            top = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[top], dist[top]
+        order = np.lexsort((-cols['ids'][idx], dist))[offset:offset + limit]
+        return cols['ids'][idx[order]].tolist(), dist[order].tolist()
+
+    def query(self, *, limit: int = 50, offset: int = 0, user_lat=None, user_lon=None, radius=None,
+              radius_unit: str = 'mi', count_only: bool = False, **filters):
+        """Return (total, page_ids, page_distances) for the filters, ordered like get_listings.
+
+        Without a geo filter the order is listing_id DESC; with one it is distance ASC,
+        listing_id DESC and only listings within `radius` match.
+        """
+        import numpy as np
+        cols, alive = self.cols, self.alive
+        geo = user_lat is not None and user_lon is not None and radius is not None
+        # With a geo filter, rows without coordinates fail the lat/lon box comparisons (NaN) anyway
+        with_coords = filters.pop('with_coords', False) and not geo
+        lat_range = self._lat_band(user_lat, radius, radius_unit) if geo else None
+        mask = self._mask(cols, alive, with_coords=with_coords, lat_range=lat_range, **filters)
+        idx = np.flatnonzero(mask)
+        if not geo:
+            if count_only:
+                return len(idx), [], None
+            page = idx[::-1][offset:offset + limit]
+            return len(idx), cols['ids'][page].tolist(), None
+        # Exact distances only for the rows inside the lat/lon box
+        idx = self._lon_band(cols, idx, user_lat, user_lon, radius, radius_unit)
+        dist = self.distances(cols['lat'][idx], cols['lon'][idx], user_lat, user_lon, radius_unit)
+        within = dist <= radius
+        idx, dist = idx[within], dist[within]
+        if count_only:
+            return len(idx), [], None
+        k = min(offset + limit, len(idx))
+        if k < len(idx):
+            top = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[top], dist[top]
+        order = np.lexsort((-cols['ids'][idx], dist))[offset:offset + limit]
+        return int(within.sum()), cols['ids'][idx[order]].tolist(), dist[order].tolist()
+
+
+listing_index = ListingIndex()
+
+
+async def _listing_index_loop():
+    """Build the listing index, then keep it current by watermark with periodic full rebuilds."""
+    while True:
         try:
-            # Fail fast if COUNT(*) would take too long (5s)
-            await conn.execute("SET LOCAL statement_timeout = 5000")
-            total_listings = await conn.fetchval("SELECT COUNT(*) FROM listings")
-            total_cars = await conn.fetchval("SELECT COUNT(*) FROM cars")
-            return {"total_listings": total_listings, "total_cars": total_cars}
+            if not listing_index.ready or time.time() - listing_index.built_at >= LISTING_INDEX_REBUILD_SECONDS:
+                await listing_index.build(pool)
+            else:
+                await listing_index.refresh(pool)
+            # Sort the nearest-N grid for the new arrays here rather than in the first request
+            cols = listing_index.cols
+            if cols is not None:
+                await asyncio.to_thread(listing_index._grid, cols)
+            await share_snapshot('listing_index')
         except Exception as e:
-            # Fallback to estimated counts
-            try:
-                est_listings = await conn.fetchval("SELECT COALESCE(reltuples::bigint,0) FROM pg_class WHERE relname = 'listings'")
-                est_cars = await conn.fetchval("SELECT COALESCE(reltuples::bigint,0) FROM pg_class WHERE relname = 'cars'")
-                return {
-                    "total_listings": int(est_listings or 0),
-                    "total_cars": int(est_cars or 0),
-                    "note": "estimated counts due to DB timeout/error"
-                }
-            except Exception:
-                raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            print(f"⚠️  Listing index update failed: {e}", flush=True)
+        await asyncio.sleep(LISTING_INDEX_REFRESH_SECONDS)
 
 
-@app.get("/api/listings")
-async def get_listings(
-    limit: int = Query(50, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
-    q: Optional[str] = None,
-    vin: Optional[str] = None,
-    listing_id: Optional[int] = None,
-    make_id: Optional[int] = None,
-    model_id: Optional[int] = None,
-    min_year: Optional[int] = None,
-    max_year: Optional[int] = None,
-    min_price: Optional[int] = None,
-    max_price: Optional[int] = None,
-    min_odometer: Optional[int] = None,
-    max_odometer: Optional[int] = None,
-    drive: Optional[int] = None,
-    transmission: Optional[int] = None,
-    with_coords: bool = False,
-    user_lat: Optional[float] = None,
-    user_lon: Optional[float] = None,
-    radius: Optional[float] = None,
-    radius_unit: Optional[str] = 'mi'
-):
-    """Get listings with optional filtering."""
-    if pool is None:
+async def hydrate_listings(listing_ids: List[int], distances: Optional[List[float]] = None,
+                           distance_unit: Optional[str] = None) -> List[dict]:
+    """Fetch full rows for a page of listing ids, preserving their order."""
+    if not listing_ids:
         return []
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(HYDRATE_LISTINGS_SQL, listing_ids)
+    by_id = {row['listing_id']: row for row in rows}
+    results = []
+    for i, listing_id in enumerate(listing_ids):
+        row = by_id.get(listing_id)
+        # Deleted since the index was last refreshed
+        if row is None:
+            continue
+        results.append(listing_to_dict(row, distances[i] if distances else None, distance_unit))
+    return results
 
-    print(f"get_listings called with user_lat={user_lat}, user_lon={user_lon}, radius={radius}, with_coords={with_coords}", flush=True)
 
+def _index_filters(min_price, max_price, make_id, model_id, min_year, max_year, min_odometer, max_odometer,
+                   drive, transmission, with_coords) -> dict:
+    return {
+        'min_price': min_price, 'max_price': max_price, 'make_id': make_id, 'model_id': model_id,
+        'min_year': min_year, 'max_year': max_year, 'min_odometer': min_odometer, 'max_odometer': max_odometer,
+        'drive': drive, 'transmission': transmission, 'with_coords': with_coords,
+    }
+
+
+def build_listing_filters(
+    listing_id=None, vin=None, with_coords=False, min_price=None, max_price=None, make_id=None, model_id=None,
+    min_year=None, max_year=None, min_odometer=None, max_odometer=None, drive=None, transmission=None,
+    user_lat=None, user_lon=None, radius=None, radius_unit='mi'
+):
+    """Build WHERE clauses over LISTING_SELECT. Returns (filters, params, geo_distance_expr or None)."""
     # Build filters using $n placeholders for asyncpg
     filters = []
     params: List = []
@@ -369,58 +1572,103 @@ async def get_listings(
         params.append(transmission)
 
     # Handle geo-distance filter (haversine/acos formula). If user provides lat/lon and a radius, apply filter.
+    # With lat/lon but no radius, only the distance is computed (nearest-N ordering).
     geo_distance_expr = None
-    geo_used = False
     print(f"Checking geo filter: user_lat={user_lat} is not None: {user_lat is not None}, user_lon={user_lon} is not None: {user_lon is not None}, radius={radius} is not None: {radius is not None}", flush=True)
-    if user_lat is not None and user_lon is not None and radius is not None:
+    if user_lat is not None and user_lon is not None:
         # Ensure listings have coords
         if not with_coords:
             filters.append("l.listing_latitude IS NOT NULL AND l.listing_longitude IS NOT NULL")
         # Choose Earth radius in requested units
-        earth_radius = 3958.7613 if (radius_unit or 'mi') == 'mi' else 6371.0088
-        # Parameter indices for user lat, lon, and radius
+        earth_radius = EARTH_RADIUS['mi'] if (radius_unit or 'mi') == 'mi' else EARTH_RADIUS['km']
+        # Parameter indices for user lat and lon
         lat_idx = len(params) + 1
         lon_idx = len(params) + 2
-        radius_idx = len(params) + 3
+        # Clamp the cosine: rounding can push it just past 1 for listings at the user's location
         geo_distance_expr = (
-            f"({earth_radius} * acos(cos(radians(${lat_idx})) * cos(radians(l.listing_latitude)) * "
-            f"cos(radians(l.listing_longitude) - radians(${lon_idx})) + sin(radians(${lat_idx})) * sin(radians(l.listing_latitude))))"
+            f"({earth_radius} * acos(LEAST(1.0, GREATEST(-1.0, cos(radians(${lat_idx})) * cos(radians(l.listing_latitude)) * "
+            f"cos(radians(l.listing_longitude) - radians(${lon_idx})) + sin(radians(${lat_idx})) * sin(radians(l.listing_latitude))))))"
         )
-        # Filter by distance
-        filters.append(f"{geo_distance_expr} <= ${radius_idx}")
         # Append user params in the same order
-        params.extend([user_lat, user_lon, radius])
-        geo_used = True
-        print(f"Applying geo filter: lat={user_lat} lon={user_lon} radius={radius} unit={radius_unit}")
+        params.extend([user_lat, user_lon])
+        if radius is not None:
+            # Filter by distance
+            filters.append(f"{geo_distance_expr} <= ${len(params) + 1}")
+            params.append(radius)
+            print(f"Applying geo filter: lat={user_lat} lon={user_lon} radius={radius} unit={radius_unit}")
+        else:
+            print(f"Ordering by distance from lat={user_lat} lon={user_lon} unit={radius_unit}")
+
+    return filters, params, geo_distance_expr
+
+
+@app.get("/api/listings")
+@cached_json(LISTING_PAGE_CACHE_SECONDS)
+async def get_listings(
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    q: Optional[str] = None,
+    vin: Optional[str] = None,
+    listing_id: Optional[int] = None,
+    make_id: Optional[int] = None,
+    model_id: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_odometer: Optional[int] = None,
+    max_odometer: Optional[int] = None,
+    drive: Optional[int] = None,
+    transmission: Optional[int] = None,
+    with_coords: bool = False,
+    user_lat: Optional[float] = None,
+    user_lon: Optional[float] = None,
+    radius: Optional[float] = None,
+    radius_unit: Optional[str] = 'mi'
+):
+    """Get listings with optional filtering."""
+    if pool is None:
+        raise db_not_ready()
+
+    print(f"get_listings called with user_lat={user_lat}, user_lon={user_lon}, radius={radius}, with_coords={with_coords}", flush=True)
+
+    # Text/VIN/id lookups go to Postgres; everything else can be answered by the listing index
+    if listing_index.ready and not (q or vin or listing_id):
+        geo_used = user_lat is not None and user_lon is not None
+        unit = 'mi' if (radius_unit or 'mi') == 'mi' else 'km'
+        index_filters = _index_filters(min_price, max_price, make_id, model_id, min_year, max_year,
+                                       min_odometer, max_odometer, drive, transmission, with_coords)
+        if geo_used and radius is None:
+            # Nearest-N: grid search around the user, no radius needed
+            page_ids, distances = listing_index.nearest(
+                user_lat=user_lat, user_lon=user_lon, limit=limit, offset=offset, radius_unit=unit, **index_filters
+            )
+            total = len(page_ids)
+        else:
+            total, page_ids, distances = listing_index.query(
+                limit=limit, offset=offset, user_lat=user_lat, user_lon=user_lon, radius=radius, radius_unit=unit,
+                **index_filters
+            )
+        try:
+            results = await hydrate_listings(page_ids, distances, unit if geo_used else None)
+        except Exception as e:
+            print(f"DB error: {e}")
+            return []
+        print(f"Returning {len(results)} results (listing index, {total} matches)")
+        return results
+
+    filters, params, geo_distance_expr = build_listing_filters(
+        listing_id, vin, with_coords, min_price, max_price, make_id, model_id, min_year, max_year,
+        min_odometer, max_odometer, drive, transmission, user_lat, user_lon, radius, radius_unit
+    )
+    geo_used = geo_distance_expr is not None
 
     sql_limit = min(max(limit * 10, 100), 1000) if (q or vin or listing_id) else limit
 
     # Build SELECT and include a distance column when geo is used for ordering
     select_extra = f", {geo_distance_expr} AS distance" if geo_used else ""
 
-    query = f"""
-        SELECT 
-            l.listing_id, 
-            l.listing_price, 
-            l.listing_odometer, 
-            d.description_text AS listing_description, 
-            l.listing_vin_id,
-            l.listing_latitude AS listing_lat,
-            l.listing_longitude AS listing_lon,
-            r.region_name AS listing_region, 
-            c.year AS listing_year,
-            mk.make_name || ' ' || md.model_name AS listing_make_model,
-            tr.transmission_type AS listing_transmission_type,
-            dr.drives_type AS listing_drive_type{select_extra}
-        FROM listings l
-        LEFT JOIN cars c ON l.listing_vin_id = c.vin_id
-        LEFT JOIN models md ON c.model_id = md.model_id
-        LEFT JOIN makes mk ON md.make_id = mk.make_id
-        LEFT JOIN drives dr ON c.drives_id = dr.drives_id
-        LEFT JOIN transmissions tr ON c.transmission_id = tr.transmission_id
-        LEFT JOIN regions r ON l.listing_region_id = r.region_id
-        LEFT JOIN descriptions d ON l.listing_description_id = d.description_id
-    """
+    query = LISTING_SELECT.format(select_extra=select_extra)
 
     if filters:
         query += " WHERE " + " AND ".join(filters)
@@ -446,22 +1694,11 @@ async def get_listings(
         if vin and len(vin) > 17:
             skipped_vin_count += 1
             continue
-        results.append({
-            'listing_id': row['listing_id'],
-            'listing_price': row['listing_price'],
-            'listing_odometer': row['listing_odometer'],
-            'listing_description': decompress_description(row['listing_description']),
-            'listing_vin_id': vin,
-            'listing_lat': str(row['listing_lat']) if row['listing_lat'] is not None else None,
-            'listing_lon': str(row['listing_lon']) if row['listing_lon'] is not None else None,
-            'listing_region': row['listing_region'],
-            'listing_year': row['listing_year'],
-            'listing_make_model': row['listing_make_model'],
-            'listing_transmission_type': row['listing_transmission_type'],
-            'listing_drive_type': row['listing_drive_type'],
-            'distance': float(row['distance']) if 'distance' in row and row['distance'] is not None else None,
-            'distance_unit': 'mi' if geo_used and (radius_unit or 'mi') == 'mi' else ('km' if geo_used else None)
-        })
+        results.append(listing_to_dict(
+            row,
+            row['distance'] if 'distance' in row else None,
+            'mi' if geo_used and (radius_unit or 'mi') == 'mi' else ('km' if geo_used else None)
+        ))
 
     if skipped_vin_count > 0:
         print(f"Skipped {skipped_vin_count} listings due to long VIN (>17 chars)")
@@ -482,11 +1719,964 @@ async def get_listings(
     return results
 
 
+@app.get("/api/listings/count")
+async def count_listings(
+    make_id: Optional[int] = None,
+    model_id: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_odometer: Optional[int] = None,
+    max_odometer: Optional[int] = None,
+    drive: Optional[int] = None,
+    transmission: Optional[int] = None,
+    with_coords: bool = False,
+    user_lat: Optional[float] = None,
+    user_lon: Optional[float] = None,
+    radius: Optional[float] = None,
+    radius_unit: Optional[str] = 'mi'
+):
+    """Count listings matching the /api/listings filters (from the listing index when it is built)."""
+    unit = 'mi' if (radius_unit or 'mi') == 'mi' else 'km'
+    if radius is None and user_lat is not None and user_lon is not None:
+        # Nearest-N mode has no distance cutoff: every listing with coordinates is a candidate
+        with_coords, user_lat, user_lon = True, None, None
+    if listing_index.ready:
+        total, _, _ = listing_index.query(
+            user_lat=user_lat, user_lon=user_lon, radius=radius, radius_unit=unit, count_only=True,
+            **_index_filters(min_price, max_price, make_id, model_id, min_year, max_year,
+                             min_odometer, max_odometer, drive, transmission, with_coords)
+        )
+        return {"count": total, "source": "index"}
+    if pool is None:
+        raise db_not_ready()
+
+    filters, params, _ = build_listing_filters(
+        None, None, with_coords, min_price, max_price, make_id, model_id, min_year, max_year,
+        min_odometer, max_odometer, drive, transmission, user_lat, user_lon, radius, unit
+    )
+    # Same exclusion get_listings applies after fetching
+    filters.append("(l.listing_vin_id IS NULL OR length(l.listing_vin_id) <= 17)")
+    query = """
+        SELECT COUNT(*)
+        FROM listings l
+        LEFT JOIN cars c ON l.listing_vin_id = c.vin_id
+        LEFT JOIN models md ON c.model_id = md.model_id
+        LEFT JOIN makes mk ON md.make_id = mk.make_id
+        WHERE """ + " AND ".join(filters)
+    try:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SET LOCAL statement_timeout = 5000")
+                total = await conn.fetchval(query, *params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return {"count": total, "source": "database"}
+
+
+# Change feed for /api/listings/stream: one shared source of listing changes fanned out to
+# every subscriber. Statement-level triggers NOTIFY the ids of inserted/updated listings on a
+# single LISTEN connection; without permission to install them, a listing_id watermark
+# poller is used instead (new listings only). The triggers are installed once at startup,
+# only if pg_trigger shows they are missing, never from a request. Changed ids are hydrated
+# in one query per flush and matched against each subscriber's filters in memory, so DB
+# load does not depend on the number of connected clients. The LISTEN connection is
+# closed when the last subscriber leaves.
+LISTING_FEED_CHANNEL = 'listing_changes'
+LISTING_FEED_FLUSH_SECONDS = float(os.getenv('LISTING_FEED_FLUSH_SECONDS', '1'))
+LISTING_FEED_POLL_SECONDS = float(os.getenv('LISTING_FEED_POLL_SECONDS', '5'))
+LISTING_FEED_KEEPALIVE_SECONDS = 15
+LISTING_FEED_QUEUE_SIZE = 1000
+LISTING_FEED_HYDRATE_CHUNK = 1000
+LISTING_FEED_TRIGGER_NAMES = ['listings_notify_insert', 'listings_notify_update']
+
+LISTING_FEED_TRIGGERS = f"""
+    CREATE OR REPLACE FUNCTION notify_listing_changes() RETURNS trigger AS $$
+    DECLARE
+        ids text;
+    BEGIN
+        -- NOTIFY payloads are limited to 8000 bytes: send ids in groups of 500
+        FOR ids IN
+            SELECT string_agg(listing_id::text, ',')
+            FROM (SELECT listing_id, (row_number() OVER ()) / 500 AS grp FROM changed_rows) s
+            GROUP BY grp
+        LOOP
+            PERFORM pg_notify('{LISTING_FEED_CHANNEL}', ids);
+        END LOOP;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+    DROP TRIGGER IF EXISTS listings_notify_insert ON listings;
+    CREATE TRIGGER listings_notify_insert AFTER INSERT ON listings
+        REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_listing_changes();
+    DROP TRIGGER IF EXISTS listings_notify_update ON listings;
+    CREATE TRIGGER listings_notify_update AFTER UPDATE ON listings
+        REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION notify_listing_changes();
+"""
+
+# Attributes the in-memory predicates need, in addition to the LISTING_SELECT columns
+LISTING_FEED_SELECT_EXTRA = """,
+            md.make_id AS feed_make_id,
+            c.model_id AS feed_model_id,
+            c.drives_id AS feed_drive,
+            c.transmission_id AS feed_transmission"""
+LISTING_BY_ID_SQL = LISTING_SELECT.format(select_extra=LISTING_FEED_SELECT_EXTRA) + " WHERE l.listing_id = $1"
+
+
+def listing_matches(row, f: dict):
+    """Evaluate /api/listings filters against one hydrated listing row.
+
+    Returns False if it does not match, otherwise the distance (or True without a geo filter).
+    `f` holds the get_listings parameters; the description is only decompressed for `q`.
+    """
+    def between(value, lo, hi):
+        if lo is None and hi is None:
+            return True
+        if value is None:
+            return False
+        return (lo is None or value >= lo) and (hi is None or value <= hi)
+
+    vin = row['listing_vin_id']
+    if vin and len(vin) > 17:
+        return False
+    if f['listing_id'] and row['listing_id'] != f['listing_id']:
+        return False
+    if f['vin'] and f['vin'].lower() not in (vin or '').lower():
+        return False
+    if not between(row['listing_price'], f['min_price'], f['max_price']):
+        return False
+    if not between(row['listing_odometer'], f['min_odometer'], f['max_odometer']):
+        return False
+    if not between(row['listing_year'], f['min_year'], f['max_year']):
+        return False
+    for key, column in (('make_id', 'feed_make_id'), ('model_id', 'feed_model_id'),
+                        ('drive', 'feed_drive'), ('transmission', 'feed_transmission')):
+        if f[key] is not None and row[column] != f[key]:
+            return False
+    lat, lon = row['listing_lat'], row['listing_lon']
+    geo = f['user_lat'] is not None and f['user_lon'] is not None
+    if (f['with_coords'] or geo) and (lat is None or lon is None):
+        return False
+    if f['q']:
+        q = f['q'].lower()
+        if q not in (decompress_description(row['listing_description']) or '').lower() and q not in (vin or '').lower():
+            return False
+    if not geo:
+        return True
+    ulat, ulon = math.radians(f['user_lat']), math.radians(f['user_lon'])
+    rlat, rlon = math.radians(float(lat)), math.radians(float(lon))
+    cos_c = math.cos(ulat) * math.cos(rlat) * math.cos(rlon - ulon) + math.sin(ulat) * math.sin(rlat)
+    distance = EARTH_RADIUS[f['radius_unit']] * math.acos(max(-1.0, min(1.0, cos_c)))
+    return distance if f['radius'] is None or distance <= f['radius'] else False
+
+
+class ListingFeed:
+    """Shared listing change source with per-subscriber queues."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.pending = set()
+        self.watermark: Optional[int] = None
+        self.mode: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.install_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, filters: dict) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=LISTING_FEED_QUEUE_SIZE)
+        self.subscribers[queue] = filters
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        self.pending.update(int(i) for i in payload.split(',') if i)
+
+    @staticmethod
+    async def _triggers_installed(conn) -> bool:
+        count = await conn.fetchval(
+            "SELECT count(*) FROM pg_trigger WHERE tgrelid = 'listings'::regclass AND tgname = ANY($1::text[])",
+            LISTING_FEED_TRIGGER_NAMES
+        )
+        return count == len(LISTING_FEED_TRIGGER_NAMES)
+
+    async def install_triggers(self):
+        """Install the NOTIFY triggers if they are missing (run once per worker at startup).
+
+        Workers serialize on an advisory lock, and a short lock_timeout keeps the DDL from
+        queueing behind long transactions on listings (and reads from queueing behind it).
+        """
+        try:
+            async with pool.acquire() as conn:
+                if not await self._triggers_installed(conn):
+                    async with conn.transaction():
+                        await conn.execute("SELECT pg_advisory_xact_lock(hashtext('listing_feed_triggers'))")
+                        await conn.execute("SET LOCAL lock_timeout = '2s'")
+                        if not await self._triggers_installed(conn):
+                            await conn.execute(LISTING_FEED_TRIGGERS)
+                            print("✅ Listing feed: NOTIFY triggers installed", flush=True)
+            self.mode = 'notify'
+        except Exception as e:
+            print(f"⚠️  Listing feed: could not install NOTIFY triggers ({e}); polling by listing_id instead", flush=True)
+            self.mode = 'poll'
+
+    async def _run(self):
+        if self.mode is None:
+            if self.install_task is not None:
+                await asyncio.shield(self.install_task)
+            else:
+                # No startup hook ran (Lambda): use the triggers only if they already exist
+                async with pool.acquire() as conn:
+                    self.mode = 'notify' if await self._triggers_installed(conn) else 'poll'
+        async with pool.acquire() as conn:
+            self.watermark = await conn.fetchval("SELECT COALESCE(MAX(listing_id), 0) FROM listings")
+        print(f"✅ Listing feed started ({self.mode}, watermark {self.watermark})", flush=True)
+        # Runs until the last subscriber leaves; the next subscribe() starts it again
+        while self.subscribers:
+            try:
+                if self.mode == 'notify':
+                    await self._listen()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Listing feed error: {e}; reconnecting", flush=True)
+                await asyncio.sleep(LISTING_FEED_POLL_SECONDS)
+
+    async def _listen(self):
+        conn = await asyncpg.connect(**await pg_connect_kwargs())
+        try:
+            self.pending = set()
+            await conn.add_listener(LISTING_FEED_CHANNEL, self._on_notify)
+            # Catch up on inserts missed while (re)connecting
+            await self._publish_new()
+            while self.subscribers:
+                if conn.is_closed():
+                    raise ConnectionError("LISTEN connection closed")
+                await asyncio.sleep(LISTING_FEED_FLUSH_SECONDS)
+                if self.pending:
+                    ids, self.pending = sorted(self.pending), set()
+                    await self._publish(ids)
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+    async def _poll(self):
+        while self.subscribers:
+            await self._publish_new()
+            await asyncio.sleep(LISTING_FEED_POLL_SECONDS)
+
+    async def _publish_new(self):
+        async with pool.acquire() as conn:
+            ids = await conn.fetch("SELECT listing_id FROM listings WHERE listing_id > $1 ORDER BY listing_id", self.watermark)
+        await self._publish([r['listing_id'] for r in ids])
+
+    async def _publish(self, ids: List[int]):
+        """Hydrate changed listings once and deliver matches to every subscriber."""
+        if not ids:
+            return
+        self.watermark = max(self.watermark or 0, max(ids))
+        if not self.subscribers:
+            return
+        query = LISTING_SELECT.format(select_extra=LISTING_FEED_SELECT_EXTRA) + " WHERE l.listing_id = ANY($1::bigint[]) ORDER BY l.listing_id"
+        for i in range(0, len(ids), LISTING_FEED_HYDRATE_CHUNK):
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(query, ids[i:i + LISTING_FEED_HYDRATE_CHUNK])
+            for queue, f in list(self.subscribers.items()):
+                for row in rows:
+                    match = listing_matches(row, f)
+                    if match is False:
+                        continue
+                    geo = match is not True
+                    item = listing_to_dict(row, match if geo else None, f['radius_unit'] if geo else None)
+                    try:
+                        queue.put_nowait(item)
+                    except asyncio.QueueFull:
+                        # Slow client: drop its backlog and tell it to refetch
+                        while not queue.empty():
+                            queue.get_nowait()
+                        queue.put_nowait(None)
+                        break
+
+
+listing_feed = ListingFeed()
+
+
+@app.get("/api/listings/stream")
+async def stream_listings(
+    request: Request,
+    q: Optional[str] = None,
+    vin: Optional[str] = None,
+    listing_id: Optional[int] = None,
+    make_id: Optional[int] = None,
+    model_id: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_odometer: Optional[int] = None,
+    max_odometer: Optional[int] = None,
+    drive: Optional[int] = None,
+    transmission: Optional[int] = None,
+    with_coords: bool = False,
+    user_lat: Optional[float] = None,
+    user_lon: Optional[float] = None,
+    radius: Optional[float] = None,
+    radius_unit: Optional[str] = 'mi'
+):
+    """Push new or changed listings matching the /api/listings filters as server-sent events.
+
+    Events: `listing` (same shape as /api/listings items) and `resync` when the client fell
+    too far behind and should refetch /api/listings.
+    """
+    if pool is None:
+        raise db_not_ready()
+    filters = {
+        'q': q, 'vin': vin, 'listing_id': listing_id, 'make_id': make_id, 'model_id': model_id,
+        'min_year': min_year, 'max_year': max_year, 'min_price': min_price, 'max_price': max_price,
+        'min_odometer': min_odometer, 'max_odometer': max_odometer, 'drive': drive,
+        'transmission': transmission, 'with_coords': with_coords, 'user_lat': user_lat,
+        'user_lon': user_lon, 'radius': radius, 'radius_unit': 'mi' if (radius_unit or 'mi') == 'mi' else 'km',
+    }
+    queue = listing_feed.subscribe(filters)
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), LISTING_FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    yield _sse('resync', {})
+                else:
+                    yield _sse('listing', item)
+        finally:
+            listing_feed.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# Comparable listings and fair-price estimates. Price/odometer statistics per (model_id, year)
+# come from one aggregate query refreshed in the background, so a request only looks up a
+# dict entry and ranks the same-model candidates (from the listing index when it is built).
+PRICE_STATS_REFRESH_SECONDS = int(os.getenv('PRICE_STATS_REFRESH_SECONDS', '3600'))
+# Listing prices outside this range (placeholders like $1, typos) are left out of the statistics
+PRICE_STATS_MIN_PRICE = 500
+PRICE_STATS_MAX_PRICE = 500000
+PRICE_STATS_MAX_ODOMETER = 500000
+# Minimum listings in a (model, year) group for an estimate / for the mileage adjustment
+PRICE_STATS_MIN_COUNT = 5
+PRICE_STATS_MIN_REGRESSION = 20
+PRICE_STATS_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Similarity score: one model year apart weighs as much as COMPARABLE_ODOMETER_SCALE miles
+# or COMPARABLE_DISTANCE_SCALE miles away; unknown odometer/location costs one unit each
+COMPARABLE_YEAR_SPAN = 2
+COMPARABLE_ODOMETER_SCALE = 20000
+COMPARABLE_DISTANCE_SCALE = 100
+
+PRICE_STATS_SQL = f"""
+    SELECT
+        c.model_id,
+        c.year,
+        COUNT(*) AS n,
+        percentile_cont(ARRAY{list(PRICE_STATS_QUANTILES)}::float8[]) WITHIN GROUP (ORDER BY l.listing_price) AS price_quantiles,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY l.listing_odometer) AS odometer_median,
+        regr_slope(l.listing_price, l.listing_odometer) FILTER (WHERE l.listing_odometer <= $3) AS odometer_slope,
+        regr_count(l.listing_price, l.listing_odometer) FILTER (WHERE l.listing_odometer <= $3) AS regression_n
+    FROM listings l
+    JOIN cars c ON l.listing_vin_id = c.vin_id
+    WHERE c.model_id IS NOT NULL AND c.year IS NOT NULL
+      AND l.listing_price BETWEEN $1 AND $2
+      AND length(l.listing_vin_id) <= 17
+    GROUP BY c.model_id, c.year
+"""
+
+
+class PriceStats:
+    """Price/odometer statistics per (model_id, year), replaced as a whole on refresh."""
+
+    def __init__(self):
+        self.groups: dict = {}
+        self.refreshed_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at > 0
+
+    @property
+    def version(self) -> float:
+        return self.refreshed_at
+
+    def snapshot(self):
+        return {}, {'groups': self.groups, 'refreshed_at': self.refreshed_at}
+
+    def restore(self, arrays: dict, objects: dict):
+        self.groups, self.refreshed_at = objects['groups'], objects['refreshed_at']
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Held around every refresh, so the background loop and a first request never scan at once."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def refresh(self, db_pool):
+        started = time.perf_counter()
+        async with db_pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                rows = await conn.fetch(PRICE_STATS_SQL, PRICE_STATS_MIN_PRICE, PRICE_STATS_MAX_PRICE,
+                                        PRICE_STATS_MAX_ODOMETER)
+        self.groups = {
+            (row['model_id'], row['year']): {
+                'n': row['n'],
+                'price_quantiles': list(row['price_quantiles']),
+                'odometer_median': row['odometer_median'],
+                'odometer_slope': row['odometer_slope'] if (row['regression_n'] or 0) >= PRICE_STATS_MIN_REGRESSION else None,
+            }
+            for row in rows
+        }
+        self.refreshed_at = time.time()
+        print(f"✅ Price stats refreshed: {len(self.groups)} model/year groups in {time.perf_counter() - started:.1f}s", flush=True)
+
+    async def ensure_ready(self, db_pool):
+        """Load on first use when the background refresh has not run (e.g. on Lambda).
+
+        Followers in multi-worker mode wait for the leader's snapshot instead.
+        """
+        if self.ready or await wait_for_snapshot(self):
+            return
+        async with self.lock:
+            if not self.ready:
+                await self.refresh(db_pool)
+                await share_snapshot('price_stats')
+
+    def estimate(self, model_id: Optional[int], year: Optional[int], odometer: Optional[float]) -> Optional[dict]:
+        """Fair price for a listing: the group median, adjusted along the mileage regression.
+
+        The adjustment only applies with enough data and a depreciating (negative) slope, and
+        the result is kept inside the group's 10th-90th percentile.
+        """
+        group = self.groups.get((model_id, year))
+        if group is None or group['n'] < PRICE_STATS_MIN_COUNT:
+            return None
+        p10, p25, median, p75, p90 = group['price_quantiles']
+        slope = group['odometer_slope']
+        adjustment = 0.0
+        if odometer is not None and slope is not None and slope < 0 and group['odometer_median'] is not None:
+            adjustment = slope * (min(float(odometer), PRICE_STATS_MAX_ODOMETER) - group['odometer_median'])
+
+        def clamp(price):
+            return round(min(max(price, p10), p90))
+
+        return {
+            'price': clamp(median + adjustment),
+            'low': clamp(p25 + adjustment),
+            'high': clamp(p75 + adjustment),
+            'sample_size': group['n'],
+            'group_median_price': round(median),
+            'group_median_odometer': round(group['odometer_median']) if group['odometer_median'] is not None else None,
+            'price_per_mile': round(slope, 4) if slope is not None else None,
+        }
+
+
+price_stats = PriceStats()
+
+
+async def _price_stats_loop():
+    while True:
+        try:
+            async with price_stats.lock:
+                await price_stats.refresh(pool)
+            await share_snapshot('price_stats')
+            if PRICE_STATS_REFRESH_SECONDS <= 0:
+                return
+        except Exception as e:
+            print(f"⚠️  Price stats refresh failed: {e}", flush=True)
+        await asyncio.sleep(PRICE_STATS_REFRESH_SECONDS or 60)
+
+
+def rank_comparables(ids, years, odometers, lats, lons, target: dict, limit: int, unit: str):
+    """Top `limit` candidates by similarity score: (ids, distances, similarities), most similar first."""
+    import numpy as np
+    score = np.abs(years.astype(np.float64) - target['year'])
+    if target['odometer'] is not None:
+        odo_diff = np.abs(odometers.astype(np.float64) - float(target['odometer'])) / COMPARABLE_ODOMETER_SCALE
+        score += np.where(np.isnan(odo_diff), 1.0, odo_diff)
+    else:
+        score += 1.0
+    if target['lat'] is not None and target['lon'] is not None:
+        dist = ListingIndex.distances(lats, lons, float(target['lat']), float(target['lon']), unit)
+        scale = COMPARABLE_DISTANCE_SCALE * (EARTH_RADIUS[unit] / EARTH_RADIUS['mi'])
+        score += np.where(np.isnan(dist), 1.0, dist / scale)
+    else:
+        dist = np.full(len(ids), np.nan)
+        score += 1.0
+    if limit < len(ids):
+        top = np.argpartition(score, limit - 1)[:limit]
+        ids, dist, score = ids[top], dist[top], score[top]
+    order = np.lexsort((-ids, score))
+    return (ids[order].tolist(),
+            [None if math.isnan(d) else float(d) for d in dist[order]],
+            (1.0 / (1.0 + score[order])).tolist())
+
+
+async def _comparable_candidates(conn, target: dict):
+    """Same-model listings within COMPARABLE_YEAR_SPAN years as column arrays."""
+    import numpy as np
+    cols, alive = listing_index.cols, listing_index.alive
+    year_lo, year_hi = target['year'] - COMPARABLE_YEAR_SPAN, target['year'] + COMPARABLE_YEAR_SPAN
+    if listing_index.ready:
+        mask = alive & (cols['model_id'] == target['model_id']) & (cols['year'] >= year_lo) & (cols['year'] <= year_hi)
+        mask &= cols['ids'] != target['listing_id']
+        idx = np.flatnonzero(mask)
+        return cols['ids'][idx], cols['year'][idx], cols['odometer'][idx], cols['lat'][idx], cols['lon'][idx]
+    rows = await conn.fetch("""
+        SELECT l.listing_id, c.year, l.listing_odometer, l.listing_latitude, l.listing_longitude
+        FROM listings l
+        JOIN cars c ON l.listing_vin_id = c.vin_id
+        WHERE c.model_id = $1 AND c.year BETWEEN $2 AND $3 AND l.listing_id <> $4
+          AND length(l.listing_vin_id) <= 17
+    """, target['model_id'], year_lo, year_hi, target['listing_id'])
+    columns = list(zip(*rows)) or [()] * 5
+    return (np.array(columns[0], dtype=np.int64), np.array(columns[1], dtype=np.float64),
+            *(np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64) for values in columns[2:]))
+
+
+@app.get("/api/listings/{listing_id}/comparables")
+async def get_comparables(listing_id: int, limit: int = Query(10, ge=1, le=100), radius_unit: Optional[str] = 'mi'):
+    """Fair-price estimate for a listing plus the most similar listings of the same model.
+
+    Comparables share the model and are within COMPARABLE_YEAR_SPAN model years; they are
+    ranked by a similarity score over year, odometer and distance from the listing.
+    """
+    if pool is None:
+        raise db_not_ready()
+    unit = 'mi' if (radius_unit or 'mi') == 'mi' else 'km'
+    try:
+        await price_stats.ensure_ready(pool)
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(LISTING_BY_ID_SQL, listing_id)
+            if row is None:
+                raise HTTPException(status_code=404, detail="Listing not found")
+            target = {
+                'listing_id': listing_id, 'model_id': row['feed_model_id'], 'year': row['listing_year'],
+                'odometer': row['listing_odometer'], 'lat': row['listing_lat'], 'lon': row['listing_lon'],
+            }
+            if target['model_id'] is None or target['year'] is None:
+                candidates = None
+            else:
+                candidates = await _comparable_candidates(conn, target)
+        comparables = []
+        if candidates is not None and len(candidates[0]):
+            ids, distances, similarities = rank_comparables(*candidates, target=target, limit=limit, unit=unit)
+            by_id = {item['listing_id']: item for item in await hydrate_listings(ids)}
+            for comparable_id, distance, similarity in zip(ids, distances, similarities):
+                item = by_id.get(comparable_id)
+                if item is None:
+                    continue
+                item['distance'] = distance
+                item['distance_unit'] = unit if distance is not None else None
+                item['similarity'] = round(similarity, 4)
+                comparables.append(item)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return {
+        'listing': listing_to_dict(row),
+        'estimate': price_stats.estimate(target['model_id'], target['year'], target['odometer']),
+        'comparables': comparables,
+    }
+
+
+# Analytics rollups: per (region, make, model year) bucket the listing count and the count, sum,
+# min, max and a log-spaced histogram of prices (PRICE_STATS_MIN_PRICE-PRICE_STATS_MAX_PRICE)
+# in Postgres. A background task adds listings past a listing_id watermark to their buckets and
+# rebuilds everything periodically (price changes, deletions). Each process keeps the buckets as
+# arrays, so a filtered /api/analytics request merges bucket rows instead of scanning listings.
+ANALYTICS_REFRESH_SECONDS = int(os.getenv('ANALYTICS_REFRESH_SECONDS', '60'))
+ANALYTICS_REBUILD_SECONDS = int(os.getenv('ANALYTICS_REBUILD_SECONDS', '86400'))
+ANALYTICS_PRICE_BINS = 64
+ANALYTICS_STATE = 'listing_rollups'
+# NULL region/make/year are stored as -1 (bucket keys are the primary key)
+ANALYTICS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS listing_rollups (
+        region_id integer NOT NULL,
+        make_id integer NOT NULL,
+        year integer NOT NULL,
+        listings bigint NOT NULL,
+        priced bigint NOT NULL,
+        price_sum double precision NOT NULL,
+        price_min double precision,
+        price_max double precision,
+        price_hist bigint[] NOT NULL,
+        PRIMARY KEY (region_id, make_id, year)
+    );
+    CREATE TABLE IF NOT EXISTS listing_volume_daily (
+        day date NOT NULL,
+        region_id integer NOT NULL,
+        make_id integer NOT NULL,
+        listings bigint NOT NULL,
+        PRIMARY KEY (day, region_id, make_id)
+    );
+    CREATE TABLE IF NOT EXISTS listing_rollup_state (
+        name text PRIMARY KEY,
+        last_listing_id bigint NOT NULL DEFAULT 0,
+        rebuilt_at timestamptz,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    );
+"""
+
+ANALYTICS_BUCKET_SQL = """
+    SELECT
+        COALESCE(l.listing_region_id, -1) AS region_id,
+        COALESCE(md.make_id, -1) AS make_id,
+        COALESCE(c.year, -1) AS year,
+        CASE WHEN l.listing_price BETWEEN $3 AND $4
+             THEN width_bucket(l.listing_price::float8, $5::float8[]) END AS bin,
+        COUNT(*) AS n,
+        SUM(l.listing_price)::float8 AS price_sum,
+        MIN(l.listing_price)::float8 AS price_min,
+        MAX(l.listing_price)::float8 AS price_max
+    FROM listings l
+    LEFT JOIN cars c ON l.listing_vin_id = c.vin_id
+    LEFT JOIN models md ON c.model_id = md.model_id
+    WHERE l.listing_id > $1 AND l.listing_id <= $2
+      AND (l.listing_vin_id IS NULL OR length(l.listing_vin_id) <= 17)
+    GROUP BY 1, 2, 3, 4
+"""
+
+ANALYTICS_UPSERT_SQL = """
+    INSERT INTO listing_rollups AS r
+        (region_id, make_id, year, listings, priced, price_sum, price_min, price_max, price_hist)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (region_id, make_id, year) DO UPDATE SET
+        listings = r.listings + EXCLUDED.listings,
+        priced = r.priced + EXCLUDED.priced,
+        price_sum = r.price_sum + EXCLUDED.price_sum,
+        price_min = LEAST(r.price_min, EXCLUDED.price_min),
+        price_max = GREATEST(r.price_max, EXCLUDED.price_max),
+        price_hist = ARRAY(SELECT a + b FROM unnest(r.price_hist, EXCLUDED.price_hist) AS t(a, b))
+"""
+
+
+def analytics_price_edges() -> List[float]:
+    """ANALYTICS_PRICE_BINS + 1 geometric bin edges; each bin is about 11% wide."""
+    ratio = (PRICE_STATS_MAX_PRICE / PRICE_STATS_MIN_PRICE) ** (1 / ANALYTICS_PRICE_BINS)
+    return [PRICE_STATS_MIN_PRICE * ratio ** i for i in range(ANALYTICS_PRICE_BINS + 1)]
+
+
+def _merge_bucket_rows(rows) -> List[tuple]:
+    """Fold (bucket, price bin) aggregate rows into one rollup row per bucket."""
+    buckets: dict = {}
+    for row in rows:
+        key = (row['region_id'], row['make_id'], row['year'])
+        b = buckets.get(key)
+        if b is None:
+            b = buckets[key] = [0, 0, 0.0, None, None, [0] * ANALYTICS_PRICE_BINS]
+        b[0] += row['n']
+        if row['bin'] is None:
+            continue
+        b[1] += row['n']
+        b[2] += row['price_sum']
+        b[3] = row['price_min'] if b[3] is None else min(b[3], row['price_min'])
+        b[4] = row['price_max'] if b[4] is None else max(b[4], row['price_max'])
+        # width_bucket over the inner edges returns 0..ANALYTICS_PRICE_BINS - 1
+        b[5][row['bin']] += row['n']
+    return [(*key, *b) for key, b in buckets.items()]
+
+
+class AnalyticsRollups:
+    """In-memory copy of listing_rollups as column arrays (reloaded after each update)."""
+
+    def __init__(self):
+        self.cols: Optional[dict] = None
+        self.region_names: dict = {}
+        self.make_names: dict = {}
+        self.edges = analytics_price_edges()
+        self.refreshed_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._schema_created = False
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at > 0
+
+    @property
+    def version(self) -> float:
+        return self.refreshed_at
+
+    def snapshot(self):
+        return self.cols, {'region_names': self.region_names, 'make_names': self.make_names,
+                           'refreshed_at': self.refreshed_at}
+
+    def restore(self, arrays: dict, objects: dict):
+        self.cols = arrays
+        self.region_names, self.make_names = objects['region_names'], objects['make_names']
+        self.refreshed_at = objects['refreshed_at']
+
+    async def update(self, conn, rebuild: bool = False):
+        """Add listings past the watermark to their buckets in one transaction; recompute all
+        buckets instead when the last rebuild is older than ANALYTICS_REBUILD_SECONDS.
+
+        The state row is locked first, so concurrent updaters (several workers) serialize
+        instead of counting the same listings twice.
+        """
+        async with conn.transaction():
+            await conn.execute(
+                "INSERT INTO listing_rollup_state (name) VALUES ($1) ON CONFLICT (name) DO NOTHING", ANALYTICS_STATE
+            )
+            state = await conn.fetchrow("""
+                SELECT last_listing_id, rebuilt_at IS NULL OR rebuilt_at < now() - make_interval(secs => $2) AS stale
+                FROM listing_rollup_state WHERE name = $1 FOR UPDATE
+            """, ANALYTICS_STATE, ANALYTICS_REBUILD_SECONDS)
+            rebuild = rebuild or state['stale']
+            watermark = 0 if rebuild else state['last_listing_id']
+            upper = await conn.fetchval("SELECT COALESCE(MAX(listing_id), 0) FROM listings")
+            if upper <= watermark and not rebuild:
+                return
+            rows = await conn.fetch(ANALYTICS_BUCKET_SQL, watermark, upper, PRICE_STATS_MIN_PRICE,
+                                    PRICE_STATS_MAX_PRICE, self.edges[1:-1])
+            buckets = _merge_bucket_rows(rows)
+            if rebuild:
+                await conn.execute("TRUNCATE listing_rollups")
+                await conn.copy_records_to_table('listing_rollups', records=buckets, columns=[
+                    'region_id', 'make_id', 'year', 'listings', 'priced', 'price_sum', 'price_min', 'price_max', 'price_hist'
+                ])
+                # A rebuild recounts history; only listings past the old watermark are new today.
+                # The first build has no watermark and sets the baseline instead.
+                new_buckets = []
+                if 0 < state['last_listing_id'] < upper:
+                    new_buckets = _merge_bucket_rows(await conn.fetch(
+                        ANALYTICS_BUCKET_SQL, state['last_listing_id'], upper, PRICE_STATS_MIN_PRICE,
+                        PRICE_STATS_MAX_PRICE, self.edges[1:-1]
+                    ))
+            else:
+                await conn.executemany(ANALYTICS_UPSERT_SQL, buckets)
+                new_buckets = buckets
+            # New listings per day since rollups were first built
+            daily: dict = {}
+            for region_id, make_id, _, n, *_ in new_buckets:
+                daily[(region_id, make_id)] = daily.get((region_id, make_id), 0) + n
+            await conn.executemany("""
+                INSERT INTO listing_volume_daily AS v (day, region_id, make_id, listings)
+                VALUES (current_date, $1, $2, $3)
+                ON CONFLICT (day, region_id, make_id) DO UPDATE SET listings = v.listings + EXCLUDED.listings
+            """, [(region_id, make_id, n) for (region_id, make_id), n in daily.items()])
+            await conn.execute("""
+                UPDATE listing_rollup_state
+                SET last_listing_id = $2, updated_at = now(), rebuilt_at = CASE WHEN $3 THEN now() ELSE rebuilt_at END
+                WHERE name = $1
+            """, ANALYTICS_STATE, upper, rebuild)
+        print(f"✅ Analytics rollups {'rebuilt' if rebuild else 'updated'}: {len(buckets)} buckets through listing {upper}", flush=True)
+
+    async def load(self, conn):
+        import numpy as np
+        rows = await conn.fetch("""
+            SELECT region_id, make_id, year, listings, priced, price_sum, price_min, price_max, price_hist
+            FROM listing_rollups
+        """)
+        self.region_names = {r['region_id']: r['region_name'] for r in await conn.fetch("SELECT region_id, region_name FROM regions")}
+        self.make_names = {r['make_id']: r['make_name'] for r in await conn.fetch("SELECT make_id, make_name FROM makes")}
+        values = list(zip(*rows)) or [()] * 9
+        self.cols = {
+            'region_id': np.array(values[0], dtype=np.int32),
+            'make_id': np.array(values[1], dtype=np.int32),
+            'year': np.array(values[2], dtype=np.int32),
+            'listings': np.array(values[3], dtype=np.int64),
+            'priced': np.array(values[4], dtype=np.int64),
+            'price_sum': np.array(values[5], dtype=np.float64),
+            'price_min': np.array([np.nan if v is None else v for v in values[6]], dtype=np.float64),
+            'price_max': np.array([np.nan if v is None else v for v in values[7]], dtype=np.float64),
+            'price_hist': np.array(values[8], dtype=np.int32).reshape(len(rows), ANALYTICS_PRICE_BINS),
+        }
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Held around every refresh, so the background loop and a first request never scan at once."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def refresh(self, db_pool, rebuild: bool = False):
+        async with db_pool.acquire() as conn:
+            if not self._schema_created:
+                await conn.execute(ANALYTICS_SCHEMA)
+                self._schema_created = True
+            await self.update(conn, rebuild)
+            await self.load(conn)
+        self.refreshed_at = time.time()
+
+    async def ensure_ready(self, db_pool):
+        """Load on first use when the background task has not run (e.g. on Lambda).
+
+        Followers in multi-worker mode wait for the leader's snapshot instead.
+        """
+        if self.ready or await wait_for_snapshot(self):
+            return
+        async with self.lock:
+            if not self.ready:
+                await self.refresh(db_pool)
+                await share_snapshot('analytics')
+
+    def quantiles(self, hist, qs, lo, hi):
+        """Approximate quantiles of merged histograms (one row per group), interpolated
+        geometrically inside the bin and clamped to the group's exact min/max."""
+        import numpy as np
+        hist = np.atleast_2d(hist)
+        edges = np.asarray(self.edges)
+        cum = hist.cumsum(axis=1)
+        total = cum[:, -1]
+        out = []
+        for q in qs:
+            target = q * total
+            b = np.minimum((cum < target[:, None]).sum(axis=1), ANALYTICS_PRICE_BINS - 1)
+            before = np.where(b > 0, cum[np.arange(len(b)), b - 1], 0)
+            in_bin = hist[np.arange(len(b)), b]
+            frac = np.where(in_bin > 0, (target - before) / np.maximum(in_bin, 1), 0.5)
+            value = edges[b] * (edges[b + 1] / edges[b]) ** frac
+            out.append(np.where(total > 0, np.clip(value, lo, hi), np.nan))
+        return out
+
+    def _grouped(self, key: str, mask, names: Optional[dict] = None) -> List[dict]:
+        import numpy as np
+        c = self.cols
+        # Sort the selected buckets by group key and reduce each run of equal keys
+        idx = np.flatnonzero(mask)
+        idx = idx[np.argsort(c[key][idx], kind='stable')]
+        sorted_keys = c[key][idx]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if len(idx) else np.array([], dtype=np.int64)
+        keys = sorted_keys[starts]
+
+        def reduce(ufunc, column):
+            return ufunc.reduceat(c[column][idx], starts, axis=0) if len(idx) else c[column][:0]
+
+        listings = reduce(np.add, 'listings')
+        priced = reduce(np.add, 'priced')
+        price_sum = reduce(np.add, 'price_sum')
+        lo = reduce(np.fmin, 'price_min')
+        hi = reduce(np.fmax, 'price_max')
+        hist = reduce(np.add, 'price_hist')
+        (median,) = self.quantiles(hist, (0.5,), lo, hi)
+        groups = []
+        for i, k in enumerate(keys.tolist()):
+            item = {key: None if k == -1 else k}
+            if names is not None:
+                item['name'] = names.get(k)
+            item.update({
+                'listings': int(listings[i]),
+                'median_price': None if np.isnan(median[i]) else round(float(median[i])),
+                'mean_price': round(price_sum[i] / priced[i]) if priced[i] else None,
+            })
+            groups.append(item)
+        return groups
+
+    def query(self, region_id: Optional[int] = None, make_id: Optional[int] = None,
+              min_year: Optional[int] = None, max_year: Optional[int] = None) -> dict:
+        import numpy as np
+        c = self.cols
+        mask = np.ones(len(c['listings']), dtype=bool)
+        if region_id is not None:
+            mask &= c['region_id'] == region_id
+        if make_id is not None:
+            mask &= c['make_id'] == make_id
+        if min_year is not None:
+            mask &= c['year'] >= min_year
+        if max_year is not None:
+            mask &= c['year'] <= max_year
+        priced = int(c['priced'][mask].sum())
+        hist = c['price_hist'][mask].sum(axis=0)
+        lo = float(np.nanmin(c['price_min'][mask])) if priced else None
+        hi = float(np.nanmax(c['price_max'][mask])) if priced else None
+        qs = (0.1, 0.25, 0.5, 0.75, 0.9)
+        values = [float(v[0]) for v in self.quantiles(hist, qs, lo or 0, hi or 0)] if priced else [None] * len(qs)
+        return {
+            'listings': int(c['listings'][mask].sum()),
+            'priced_listings': priced,
+            'price': {
+                'min': lo,
+                'max': hi,
+                'mean': round(float(c['price_sum'][mask].sum()) / priced) if priced else None,
+                **{f"p{round(q * 100)}": None if v is None else round(v) for q, v in zip(qs, values)},
+            },
+            'price_histogram': [
+                {'start': round(self.edges[i]), 'end': round(self.edges[i + 1]), 'count': int(count)}
+                for i, count in enumerate(hist.tolist()) if count
+            ],
+            'by_region': self._grouped('region_id', mask, self.region_names),
+            'by_make': self._grouped('make_id', mask, self.make_names),
+            'by_year': self._grouped('year', mask),
+        }
+
+
+analytics_rollups = AnalyticsRollups()
+
+
+async def _analytics_loop():
+    while True:
+        try:
+            async with analytics_rollups.lock:
+                await analytics_rollups.refresh(pool)
+            await share_snapshot('analytics')
+            if ANALYTICS_REFRESH_SECONDS <= 0:
+                return
+        except Exception as e:
+            print(f"⚠️  Analytics rollup update failed: {e}", flush=True)
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS or 60)
+
+
+@app.get("/api/analytics")
+@cached_json(ANALYTICS_REFRESH_SECONDS)
+async def get_analytics(
+    region_id: Optional[int] = None,
+    make_id: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    days: int = Query(30, ge=1, le=365)
+):
+    """Price range, quantiles and histogram, per-region/make/year breakdowns and daily listing volume.
+
+    Answered from the listing rollups, so only the rollup dimensions (region, make, model year)
+    can be filtered; the daily volume honors region_id and make_id.
+    """
+    if pool is None:
+        raise db_not_ready()
+    try:
+        await analytics_rollups.ensure_ready(pool)
+        result = analytics_rollups.query(region_id, make_id, min_year, max_year)
+        rows = await pool.fetch("""
+            SELECT day, SUM(listings)::bigint AS listings
+            FROM listing_volume_daily
+            WHERE day > current_date - $1::int
+              AND ($2::int IS NULL OR region_id = $2) AND ($3::int IS NULL OR make_id = $3)
+            GROUP BY day ORDER BY day
+        """, days, region_id, make_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    result['daily_volume'] = [{'day': r['day'].isoformat(), 'listings': r['listings']} for r in rows]
+    return result
+
+
 @app.get("/api/makes")
+@cached_json(REFERENCE_CACHE_SECONDS)
 async def get_makes():
     """Get list of makes."""
     if pool is None:
-        return []
+        raise db_not_ready()
+    if reference_data.ready:
+        return reference_data.data['makes']
     async with pool.acquire() as conn:
         try:
             rows = await conn.fetch("SELECT make_id, make_name FROM makes ORDER BY make_name")
@@ -497,10 +2687,13 @@ async def get_makes():
 
 
 @app.get("/api/models")
+@cached_json(REFERENCE_CACHE_SECONDS)
 async def get_models(make_id: Optional[int] = None):
     """Get list of models, optionally filtered by make."""
     if pool is None:
-        return []
+        raise db_not_ready()
+    if reference_data.ready:
+        return reference_data.models(make_id)
     async with pool.acquire() as conn:
         try:
             if make_id:
@@ -513,11 +2706,203 @@ async def get_models(make_id: Optional[int] = None):
             return []
 
 
+# Typeahead for /api/suggest: sorted prefix keys over make names, "make model" names (also
+# reachable by the model name alone) and region names. Every word start of a name is a key,
+# so "bay" finds "SF Bay Area". Prefixes matching many keys have their top suggestions
+# precomputed; other prefixes rank their (few) matches on the fly.
+SUGGEST_REFRESH_SECONDS = int(os.getenv('SUGGEST_REFRESH_SECONDS', '3600'))
+SUGGEST_MAX_LIMIT = 50
+# Prefixes matching more keys than this get a precomputed top SUGGEST_MAX_LIMIT list
+SUGGEST_SCAN_LIMIT = 256
+
+
+def normalize_suggest_text(text: Optional[str]) -> str:
+    """Lowercase, drop punctuation ("F-150" -> "f150") and collapse spaces; keeps a trailing space."""
+    return re.sub(r'\s+', ' ', re.sub(r'[^a-z0-9\s]+', '', (text or '').lower())).lstrip()
+
+
+class SuggestIndex:
+    def __init__(self):
+        self.entries: List[dict] = []
+        self.keys: List[str] = []
+        self.key_entries: List[int] = []
+        self.tops: dict = {}
+        self.refreshed_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at > 0
+
+    @property
+    def version(self) -> float:
+        return self.refreshed_at
+
+    def snapshot(self):
+        return {}, {'entries': self.entries, 'keys': self.keys, 'key_entries': self.key_entries,
+                    'tops': self.tops, 'refreshed_at': self.refreshed_at}
+
+    def restore(self, arrays: dict, objects: dict):
+        self.entries, self.keys, self.key_entries, self.tops = (
+            objects['entries'], objects['keys'], objects['key_entries'], objects['tops']
+        )
+        self.refreshed_at = objects['refreshed_at']
+
+    @staticmethod
+    def _rank_key(entry: dict):
+        return -entry['listing_count'], entry['label']
+
+    def _top(self, entry_ids, limit: int) -> List[int]:
+        unique = set(entry_ids)
+        return heapq.nsmallest(limit, unique, key=lambda i: self._rank_key(self.entries[i]))
+
+    @classmethod
+    def _build(cls, entries: List[dict]) -> 'SuggestIndex':
+        """Sort the word-start keys and precompute top lists for broad prefixes (CPU only)."""
+        import bisect
+        pairs = set()
+        for i, entry in enumerate(entries):
+            for name in entry.pop('names'):
+                words = normalize_suggest_text(name).split(' ')
+                for w in range(len(words)):
+                    if words[w]:
+                        pairs.add((' '.join(words[w:]), i))
+        pairs = sorted(pairs)
+        fresh = cls()
+        fresh.entries = entries
+        fresh.keys = [key for key, _ in pairs]
+        fresh.key_entries = [i for _, i in pairs]
+        keys = fresh.keys
+        stack = [('', 0, len(keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            if hi - lo <= SUGGEST_SCAN_LIMIT:
+                continue
+            if prefix:
+                fresh.tops[prefix] = fresh._top(fresh.key_entries[lo:hi], SUGGEST_MAX_LIMIT)
+            # Split the range by the next character
+            start = bisect.bisect_right(keys, prefix, lo, hi)
+            while start < hi:
+                child = keys[start][:len(prefix) + 1]
+                end = bisect.bisect_left(keys, child + '~', start, hi)
+                stack.append((child, start, end))
+                start = end
+        return fresh
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Held around every refresh, so the background loop and a first request never scan at once."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def refresh(self, db_pool):
+        started = time.perf_counter()
+        async with db_pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                models = await conn.fetch("""
+                    SELECT md.model_id, md.model_name, mk.make_id, mk.make_name, COALESCE(n.listing_count, 0) AS listing_count
+                    FROM models md
+                    JOIN makes mk ON md.make_id = mk.make_id
+                    LEFT JOIN (
+                        SELECT c.model_id, COUNT(*) AS listing_count
+                        FROM listings l JOIN cars c ON l.listing_vin_id = c.vin_id
+                        GROUP BY c.model_id
+                    ) n ON n.model_id = md.model_id
+                """)
+                makes = await conn.fetch("SELECT make_id, make_name FROM makes")
+                regions = await conn.fetch("""
+                    SELECT r.region_id, r.region_name, COUNT(l.listing_id) AS listing_count
+                    FROM regions r LEFT JOIN listings l ON l.listing_region_id = r.region_id
+                    GROUP BY r.region_id, r.region_name
+                """)
+        make_counts: dict = {}
+        entries = []
+        for r in models:
+            make_counts[r['make_id']] = make_counts.get(r['make_id'], 0) + r['listing_count']
+            entries.append({
+                'type': 'model', 'label': f"{r['make_name']} {r['model_name']}", 'make_id': r['make_id'],
+                'model_id': r['model_id'], 'listing_count': r['listing_count'],
+                'names': (f"{r['make_name']} {r['model_name']}", r['model_name']),
+            })
+        entries.extend({
+            'type': 'make', 'label': r['make_name'], 'make_id': r['make_id'],
+            'listing_count': make_counts.get(r['make_id'], 0), 'names': (r['make_name'],),
+        } for r in makes)
+        entries.extend({
+            'type': 'region', 'label': r['region_name'], 'region_id': r['region_id'],
+            'listing_count': r['listing_count'], 'names': (r['region_name'],),
+        } for r in regions)
+        fresh = await asyncio.to_thread(self._build, entries)
+        self.entries, self.keys, self.key_entries, self.tops = fresh.entries, fresh.keys, fresh.key_entries, fresh.tops
+        self.refreshed_at = time.time()
+        print(f"✅ Suggest index refreshed: {len(entries)} names, {len(self.keys)} keys in {time.perf_counter() - started:.1f}s", flush=True)
+
+    async def ensure_ready(self, db_pool):
+        """Load on first use when the background refresh has not run (e.g. on Lambda).
+
+        Followers in multi-worker mode wait for the leader's snapshot instead.
+        """
+        if self.ready or await wait_for_snapshot(self):
+            return
+        async with self.lock:
+            if not self.ready:
+                await self.refresh(db_pool)
+                await share_snapshot('suggest')
+
+    def suggest(self, q: str, limit: int = 10) -> List[dict]:
+        import bisect
+        prefix = normalize_suggest_text(q)
+        if not prefix:
+            return []
+        entries, keys, key_entries, tops = self.entries, self.keys, self.key_entries, self.tops
+        top = tops.get(prefix)
+        if top is None:
+            lo = bisect.bisect_left(keys, prefix)
+            hi = bisect.bisect_left(keys, prefix + '~', lo)
+            top = self._top(key_entries[lo:hi], limit)
+        return [entries[i] for i in top[:limit]]
+
+
+suggest_index = SuggestIndex()
+
+
+async def _suggest_index_loop():
+    while True:
+        try:
+            async with suggest_index.lock:
+                await suggest_index.refresh(pool)
+            await share_snapshot('suggest')
+            if SUGGEST_REFRESH_SECONDS <= 0:
+                return
+        except Exception as e:
+            print(f"⚠️  Suggest index refresh failed: {e}", flush=True)
+        await asyncio.sleep(SUGGEST_REFRESH_SECONDS or 60)
+
+
+@app.get("/api/suggest")
+async def suggest(q: str, limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT)):
+    """Typeahead over makes, models ("make model" or the model name) and regions, most listings first."""
+    if pool is None:
+        raise db_not_ready()
+    try:
+        await suggest_index.ensure_ready(pool)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"DB error: {e}")
+        return []
+    return suggest_index.suggest(q, limit)
+
+
 @app.get("/api/drives")
+@cached_json(REFERENCE_CACHE_SECONDS)
 async def get_drives():
     """Get list of drive types."""
     if pool is None:
-        return []
+        raise db_not_ready()
+    if reference_data.ready:
+        return reference_data.data['drives']
     async with pool.acquire() as conn:
         try:
             rows = await conn.fetch("SELECT drives_id AS id, drives_type AS name FROM drives ORDER BY drives_type")
@@ -542,6 +2927,7 @@ async def geocode_address(address: str):
 
     url = 'https://maps.googleapis.com/maps/api/geocode/json'
     params = {'address': address, 'key': gkey}
+    import httpx
     try:
         async with httpx.AsyncClient(timeout=10.0) as client:
             r = await client.get(url, params=params)
@@ -567,10 +2953,13 @@ async def geocode_address(address: str):
 
 
 @app.get("/api/transmissions")
+@cached_json(REFERENCE_CACHE_SECONDS)
 async def get_transmissions():
     """Get list of transmission types."""
     if pool is None:
-        return []
+        raise db_not_ready()
+    if reference_data.ready:
+        return reference_data.data['transmissions']
     async with pool.acquire() as conn:
         try:
             rows = await conn.fetch("SELECT transmission_id AS id, transmission_type AS name FROM transmissions ORDER BY transmission_type")
@@ -887,44 +3276,806 @@ async def update_backend_service():
 
 
 class RemoveDuplicatesRequest(BaseModel):
-    interactive: bool = False
+    interactive: bool = False  # dry run: report duplicates without deleting anything
     batch_size: int = 100
+    restart: bool = False  # discard the checkpoint and fingerprints and rescan all listings
+    near_duplicate_threshold: float = 0.9  # estimated description Jaccard similarity for same-VIN listings
+
+
+# Duplicate detection: listings are scanned in listing_id order and fingerprinted in the
+# process pool (normalized VIN, description content hash, bottom-k MinHash of word
+# shingles). Fingerprints of kept listings and the last scanned listing_id are stored
+# per batch, so an interrupted run resumes from its checkpoint and later runs only
+# scan new listings. The newest listing of a duplicate group is kept.
+DEDUP_CHECKPOINT = 'remove-duplicates'
+DEDUP_MAX_BATCH_SIZE = 50000
+DEDUP_EVENT_SAMPLE = 20
+MINHASH_SIZE = 32
+SHINGLE_WORDS = 3
+
+DEDUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS listing_fingerprints (
+        listing_id bigint PRIMARY KEY,
+        vin_norm text,
+        content_hash bytea,
+        minhash bytea,
+        listing_price bigint,
+        listing_odometer bigint
+    );
+    CREATE INDEX IF NOT EXISTS listing_fingerprints_vin_idx ON listing_fingerprints (vin_norm);
+    CREATE INDEX IF NOT EXISTS listing_fingerprints_hash_idx ON listing_fingerprints (content_hash);
+    CREATE TABLE IF NOT EXISTS dedup_checkpoints (
+        name text PRIMARY KEY,
+        last_listing_id bigint NOT NULL DEFAULT 0,
+        scanned bigint NOT NULL DEFAULT 0,
+        removed bigint NOT NULL DEFAULT 0,
+        cancel_requested boolean NOT NULL DEFAULT false,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    );
+    ALTER TABLE dedup_checkpoints ADD COLUMN IF NOT EXISTS cancel_requested boolean NOT NULL DEFAULT false;
+"""
+
+
+def normalize_vin(vin: Optional[str]) -> Optional[str]:
+    """Uppercase and strip separators; returns None unless a plausible 17-character VIN remains."""
+    if not vin:
+        return None
+    v = ''.join(ch for ch in vin.upper() if ch.isalnum())
+    return v if len(v) == 17 else None
+
+
+def description_fingerprint(text: Optional[str]):
+    """Return (content_hash, minhash) for a description, or (None, None) if it has no words.
+
+    The MinHash is a bottom-k sketch: the MINHASH_SIZE smallest CRC32 values of the
+    word shingles, packed as uint32.
+    """
+    words = re.findall(r'[a-z0-9]+', (text or '').lower())
+    if not words:
+        return None, None
+    content_hash = hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=16).digest()
+    n = max(1, len(words) - SHINGLE_WORDS + 1)
+    shingles = {zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8')) for i in range(n)}
+    return content_hash, array('I', heapq.nsmallest(MINHASH_SIZE, shingles)).tobytes()
+
+
+def minhash_similarity(a: bytes, b: bytes) -> float:
+    """Estimate Jaccard similarity from two bottom-k sketches (exact for short descriptions)."""
+    sa, sb = set(array('I', a)), set(array('I', b))
+    union_k = sorted(sa | sb)[:MINHASH_SIZE]
+    if not union_k:
+        return 0.0
+    return sum(1 for h in union_k if h in sa and h in sb) / len(union_k)
+
+
+def fingerprint_listings(rows: List[tuple], _offset: int = 0) -> List[tuple]:
+    """Fingerprint (listing_id, vin, price, odometer, compressed description) rows (runs in a worker process)."""
+    out = []
+    for listing_id, vin, price, odometer, description in rows:
+        content_hash, minhash = description_fingerprint(decompress_description(description))
+        out.append((listing_id, normalize_vin(vin), content_hash, minhash, price, odometer))
+    return out
+
+
+def duplicate_reason(new: tuple, old: tuple, threshold: float) -> Optional[str]:
+    """Why fingerprint `new` duplicates `old` (both as stored in listing_fingerprints), or None."""
+    _, vin, content_hash, minhash, price, odometer = new
+    _, old_vin, old_hash, old_minhash, old_price, old_odometer = old
+    if vin is not None:
+        if vin != old_vin:
+            return None
+        if content_hash is not None and old_hash is not None:
+            if content_hash == old_hash:
+                return 'same_vin_description'
+            if minhash_similarity(minhash, old_minhash) >= threshold:
+                return 'same_vin_near_description'
+            return None
+        return 'same_vin_price_odometer' if (price, odometer) == (old_price, old_odometer) else None
+    if old_vin is None and content_hash is not None and content_hash == old_hash:
+        return 'same_description'
+    return None
+
+
+def find_duplicates(batch: List[tuple], known: List[tuple], threshold: float):
+    """Match a batch of fingerprints (ascending listing_id) against earlier ones.
+
+    Returns (kept, duplicates): the batch fingerprints to store and a list of
+    (removed_listing_id, kept_listing_id, reason). Earlier listings lose to newer ones.
+    """
+    by_vin = {}
+    by_hash = {}
+
+    def add(fp):
+        if fp[1] is not None:
+            by_vin.setdefault(fp[1], []).append(fp)
+        elif fp[2] is not None:
+            by_hash.setdefault(fp[2], []).append(fp)
+
+    for fp in known:
+        add(fp)
+    kept = {}
+    duplicates = []
+    for fp in batch:
+        bucket = by_vin.get(fp[1]) if fp[1] is not None else by_hash.get(fp[2]) if fp[2] is not None else None
+        if bucket:
+            remaining = []
+            for old in bucket:
+                reason = duplicate_reason(fp, old, threshold)
+                if reason is None:
+                    remaining.append(old)
+                else:
+                    duplicates.append((old[0], fp[0], reason))
+                    kept.pop(old[0], None)
+            bucket[:] = remaining
+        add(fp)
+        kept[fp[0]] = fp
+    return list(kept.values()), duplicates
+
+
+async def _dedup_batch(conn, rows: List[tuple], threshold: float, dry_run: bool):
+    """Fingerprint, match and apply one batch; returns the (removed, kept, reason) triples."""
+    parts = await run_in_process_pool(fingerprint_listings, rows)
+    batch = [fp for part in parts for fp in part]
+    vins = list({fp[1] for fp in batch if fp[1] is not None})
+    hashes = list({fp[2] for fp in batch if fp[1] is None and fp[2] is not None})
+    known = await conn.fetch(
+        """
+        SELECT listing_id, vin_norm, content_hash, minhash, listing_price, listing_odometer
+        FROM listing_fingerprints
+        WHERE vin_norm = ANY($1::text[]) OR (vin_norm IS NULL AND content_hash = ANY($2::bytea[]))
+        """,
+        vins, hashes
+    )
+    kept, duplicates = find_duplicates(batch, [tuple(r) for r in known], threshold)
+    removed_ids = [d[0] for d in duplicates]
+    async with conn.transaction():
+        if removed_ids:
+            await conn.execute("DELETE FROM listing_fingerprints WHERE listing_id = ANY($1::bigint[])", removed_ids)
+            if not dry_run:
+                await conn.execute("DELETE FROM listings WHERE listing_id = ANY($1::bigint[])", removed_ids)
+        await conn.copy_records_to_table(
+            'listing_fingerprints', records=kept,
+            columns=['listing_id', 'vin_norm', 'content_hash', 'minhash', 'listing_price', 'listing_odometer']
+        )
+        if not dry_run:
+            # A dry run never touches the checkpoint row, so it stays free for the cancel flag
+            await conn.execute(
+                """
+                INSERT INTO dedup_checkpoints (name, last_listing_id, scanned, removed) VALUES ($1, $2, $3, $4)
+                ON CONFLICT (name) DO UPDATE SET
+                    last_listing_id = EXCLUDED.last_listing_id,
+                    scanned = dedup_checkpoints.scanned + EXCLUDED.scanned,
+                    removed = dedup_checkpoints.removed + EXCLUDED.removed,
+                    updated_at = now()
+                """,
+                DEDUP_CHECKPOINT, rows[-1][0], len(rows), len(removed_ids)
+            )
+    if removed_ids and not dry_run:
+        listing_index.remove(removed_ids)
+        response_cache.clear()
+    return duplicates
+
+
+class DedupRun:
+    """A duplicate-removal run: a pooled connection holding the session advisory lock on
+    DEDUP_CHECKPOINT, so only one run is active across workers and instances.
+
+    The cancel flag lives in the dedup_checkpoints row, so any worker can set it.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @classmethod
+    async def begin(cls) -> Optional['DedupRun']:
+        """Take the lock and clear the cancel flag; None if another run holds the lock."""
+        conn = await pool.acquire()
+        try:
+            if await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", DEDUP_CHECKPOINT):
+                await conn.execute(DEDUP_SCHEMA)
+                await conn.execute(
+                    """
+                    INSERT INTO dedup_checkpoints (name) VALUES ($1)
+                    ON CONFLICT (name) DO UPDATE SET cancel_requested = false
+                    """,
+                    DEDUP_CHECKPOINT
+                )
+                return cls(conn)
+        except BaseException:
+            await pool.release(conn)
+            raise
+        await pool.release(conn)
+        return None
+
+    async def cancel_requested(self) -> bool:
+        return await self.conn.fetchval(
+            "SELECT cancel_requested FROM dedup_checkpoints WHERE name = $1", DEDUP_CHECKPOINT
+        )
+
+    async def release(self):
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", DEDUP_CHECKPOINT)
+        finally:
+            # Releasing also resets the session (pg_advisory_unlock_all) if the unlock failed
+            await pool.release(conn)
+
+
+async def request_dedup_cancel() -> bool:
+    """Ask the running duplicate removal (in any worker) to stop; False if none is running."""
+    async with pool.acquire() as conn:
+        if await conn.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", DEDUP_CHECKPOINT):
+            await conn.execute("SELECT pg_advisory_unlock(hashtext($1))", DEDUP_CHECKPOINT)
+            return False
+        await conn.execute("UPDATE dedup_checkpoints SET cancel_requested = true WHERE name = $1", DEDUP_CHECKPOINT)
+        return True
+
 
+async def stream_remove_duplicates(req: RemoveDuplicatesRequest, run: DedupRun):
+    """Run duplicate removal and stream progress as SSE events.
 
-async def stream_subprocess_output(cmd, process_id="default"):
-    """Stream subprocess output line by line."""
-    process = await asyncio.create_subprocess_exec(
-        *cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-        stdin=asyncio.subprocess.DEVNULL,  # Prevent hanging on input prompts
-        cwd="/scripts"  # Updated to container path
+    Events: `start`, `progress` (per batch, with a sample of the duplicates found),
+    `done`, `cancelled` and `error`. With `interactive` (dry run) all writes happen in
+    one transaction that is rolled back at the end. `run` is taken with DedupRun.begin()
+    before streaming starts and released when the stream ends.
+    """
+    dry_run = req.interactive
+    scanned = found = 0
+    started = time.perf_counter()
+    try:
+        writer = run.conn
+        async with pool.acquire() as reader:
+            outer_tx = None
+            if dry_run:
+                # Batches become savepoints inside this transaction; nothing is persisted
+                outer_tx = writer.transaction()
+                await outer_tx.start()
+            try:
+                if req.restart:
+                    await writer.execute("TRUNCATE listing_fingerprints")
+                    if not dry_run:
+                        await writer.execute(
+                            "UPDATE dedup_checkpoints SET last_listing_id = 0, scanned = 0, removed = 0, updated_at = now() "
+                            "WHERE name = $1",
+                            DEDUP_CHECKPOINT
+                        )
+                start_after = 0 if req.restart else await writer.fetchval(
+                    "SELECT last_listing_id FROM dedup_checkpoints WHERE name = $1", DEDUP_CHECKPOINT
+                )
+                yield _sse('start', {'resume_from': start_after, 'dry_run': dry_run, 'batch_size': req.batch_size})
+
+                # Server-side cursor over a consistent snapshot, in keyset (listing_id) order
+                async with reader.transaction(isolation='repeatable_read', readonly=True):
+                    cursor = await reader.cursor(
+                        """
+                        SELECT l.listing_id, l.listing_vin_id, l.listing_price::bigint, l.listing_odometer::bigint,
+                               d.description_text
+                        FROM listings l
+                        LEFT JOIN descriptions d ON l.listing_description_id = d.description_id
+                        WHERE l.listing_id > $1
+                        ORDER BY l.listing_id
+                        """,
+                        start_after
+                    )
+                    while True:
+                        # Read committed: a dry run's outer transaction still sees the flag once set
+                        if await run.cancel_requested():
+                            yield _sse('cancelled', {'scanned': scanned, 'duplicates': found, 'last_listing_id': start_after})
+                            return
+                        records = await cursor.fetch(req.batch_size)
+                        if not records:
+                            break
+                        rows = [tuple(r) for r in records]
+                        duplicates = await _dedup_batch(writer, rows, req.near_duplicate_threshold, dry_run)
+                        scanned += len(rows)
+                        found += len(duplicates)
+                        start_after = rows[-1][0]
+                        elapsed = time.perf_counter() - started
+                        yield _sse('progress', {
+                            'scanned': scanned,
+                            'duplicates': found,
+                            'last_listing_id': start_after,
+                            'rows_per_second': round(scanned / elapsed) if elapsed > 0 else None,
+                            'sample': [
+                                {'listing_id': removed, 'duplicate_of': kept, 'reason': reason}
+                                for removed, kept, reason in duplicates[:DEDUP_EVENT_SAMPLE]
+                            ],
+                        })
+            finally:
+                if outer_tx is not None:
+                    await outer_tx.rollback()
+        yield _sse('done', {
+            'scanned': scanned,
+            'duplicates': found,
+            'removed': 0 if dry_run else found,
+            'last_listing_id': start_after,
+            'seconds': round(time.perf_counter() - started, 3),
+        })
+    except Exception as e:
+        print(f"Duplicate removal failed: {e}", flush=True)
+        yield _sse('error', {'error': str(e), 'scanned': scanned, 'duplicates': found})
+    finally:
+        await run.release()
+
+
+def require_ingest_token(request: Request):
+    """Write endpoints need INGEST_TOKEN, sent as `Authorization: Bearer <token>` (404 while it is unset)."""
+    token = os.getenv('INGEST_TOKEN')
+    if not token:
+        raise HTTPException(status_code=404, detail='Ingest not configured')
+    if request.headers.get('authorization') != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail='Invalid ingest token')
+
+
+@app.post("/api/remove-duplicates")
+async def remove_duplicates(req: RemoveDuplicatesRequest, request: Request):
+    """Remove duplicate listings, streaming progress as server-sent events.
+
+    Requires INGEST_TOKEN, like /api/ingest.
+    """
+    require_ingest_token(request)
+    if pool is None:
+        raise db_not_ready()
+    if not 1 <= req.batch_size <= DEDUP_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"batch_size must be between 1 and {DEDUP_MAX_BATCH_SIZE}")
+    if not 0 <= req.near_duplicate_threshold <= 1:
+        raise HTTPException(status_code=422, detail="near_duplicate_threshold must be between 0 and 1")
+    # Taken before streaming starts so a second request (to any worker) is rejected; released
+    # when the stream ends, or by the background task if the client leaves before it starts
+    run = await DedupRun.begin()
+    if run is None:
+        raise HTTPException(status_code=409, detail="Duplicate removal already in progress")
+    return StreamingResponse(
+        stream_remove_duplicates(req, run), media_type="text/event-stream",
+        background=BackgroundTask(run.release)
     )
-    
-    # Store process for later cancellation
-    active_processes[process_id] = process
-    
+
+
+@app.post("/api/remove-duplicates/cancel")
+async def cancel_remove_duplicates(request: Request):
+    """Stop the running duplicate removal after its current batch (progress is checkpointed)."""
+    require_ingest_token(request)
+    if pool is None:
+        raise db_not_ready()
+    if not await request_dedup_cancel():
+        return {"success": False, "error": "No duplicate removal in progress"}
+    return {"success": True}
+
+
+# Bulk ingest: NDJSON listings -> COPY into per-session staging tables -> upsert.
+# Lines are parsed and descriptions compressed in a process pool while the previous
+# batch is loading; reference names are resolved to ids through in-memory caches.
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '5000'))
+INGEST_MAX_ERRORS = 20
+
+# Accepted NDJSON field names; the listing_* names match what /api/listings returns
+INGEST_FIELD_ALIASES = {
+    'listing_id': 'listing_id',
+    'vin': 'vin', 'listing_vin_id': 'vin',
+    'price': 'price', 'listing_price': 'price',
+    'odometer': 'odometer', 'listing_odometer': 'odometer',
+    'year': 'year', 'listing_year': 'year',
+    'make': 'make', 'model': 'model',
+    'drive': 'drive', 'listing_drive_type': 'drive',
+    'transmission': 'transmission', 'listing_transmission_type': 'transmission',
+    'region': 'region', 'listing_region': 'region',
+    'lat': 'lat', 'listing_lat': 'lat',
+    'lon': 'lon', 'listing_lon': 'lon',
+    'description': 'description', 'listing_description': 'description',
+}
+
+# Reference tables resolved by name: cache key -> (table, id column, name column)
+INGEST_REF_TABLES = {
+    'make': ('makes', 'make_id', 'make_name'),
+    'drive': ('drives', 'drives_id', 'drives_type'),
+    'transmission': ('transmissions', 'transmission_id', 'transmission_type'),
+    'region': ('regions', 'region_id', 'region_name'),
+}
+
+# Column ranges: listing_id is bigint, the other integer columns are int4
+INGEST_INT_RANGE = (-2**31, 2**31 - 1)
+INGEST_ID_RANGE = (1, 2**63 - 1)
+
+_ingest_ref_cache: Optional[dict] = None
+_ingest_ref_lock: Optional[asyncio.Lock] = None
+
+
+def _norm_name(value) -> Optional[str]:
+    if value is None:
+        return None
+    s = (value if type(value) is str else str(value)).strip()
+    return s or None
+
+
+def _opt_int(value, field: str, bounds=INGEST_INT_RANGE) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    if type(value) is not int:
+        if type(value) is bool:
+            raise ValueError(f"invalid {field}: {value!r}")
+        try:
+            value = int(float(value))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"invalid {field}: {value!r}")
+    if not bounds[0] <= value <= bounds[1]:
+        raise ValueError(f"{field} out of range: {value!r}")
+    return value
+
+
+def _opt_coord(value, field: str, limit: float) -> Optional[float]:
+    if value is None or value == '':
+        return None
     try:
-        while True:
-            line = await process.stdout.readline()
-            if not line:
-                break
-            yield f"data: {line.decode('utf-8', errors='ignore')}\n\n"
-        
-        await process.wait()
-        
-        if process.returncode == 0:
-            yield f"data: [DONE] Process completed successfully\n\n"
-        elif process.returncode == -15:  # SIGTERM
-            yield f"data: [CANCELLED] Process was cancelled by user\n\n"
+        f = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"invalid {field}: {value!r}")
+    if not math.isfinite(f) or abs(f) > limit:
+        raise ValueError(f"invalid {field}: {value!r}")
+    return f
+
+
+def parse_ingest_row(obj) -> dict:
+    """Validate and normalize one NDJSON listing object. Raises ValueError on bad input."""
+    if not isinstance(obj, dict):
+        raise ValueError("expected a JSON object")
+    row = {}
+    for key, value in obj.items():
+        field = INGEST_FIELD_ALIASES.get(key)
+        if field is not None:
+            row[field] = value
+    vin = _norm_name(row.get('vin'))
+    if not vin:
+        raise ValueError("missing vin")
+    if len(vin) > 17:
+        raise ValueError(f"vin too long: {vin!r}")
+    description = row.get('description')
+    return {
+        'listing_id': _opt_int(row.get('listing_id'), 'listing_id', INGEST_ID_RANGE),
+        'vin': vin.upper(),
+        'price': _opt_int(row.get('price'), 'price'),
+        'odometer': _opt_int(row.get('odometer'), 'odometer'),
+        'year': _opt_int(row.get('year'), 'year'),
+        'make': _norm_name(row.get('make')),
+        'model': _norm_name(row.get('model')),
+        'drive': _norm_name(row.get('drive')),
+        'transmission': _norm_name(row.get('transmission')),
+        'region': _norm_name(row.get('region')),
+        'lat': _opt_coord(row.get('lat'), 'lat', 90),
+        'lon': _opt_coord(row.get('lon'), 'lon', 180),
+        'description': str(description) if description else None,
+    }
+
+
+def prepare_ingest_lines(lines: List[bytes], first_line_no: int):
+    """Parse, validate and compress a chunk of NDJSON lines (runs in a worker process).
+
+    Returns (rows, received, rejected, errors) with at most INGEST_MAX_ERRORS errors.
+    """
+    try:
+        from orjson import loads, JSONDecodeError
+    except ImportError:
+        from json import loads, JSONDecodeError
+    rows = []
+    received = rejected = 0
+    errors = []
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        received += 1
+        try:
+            row = parse_ingest_row(loads(line))
+        except (JSONDecodeError, ValueError, TypeError, OverflowError) as e:
+            rejected += 1
+            if len(errors) < INGEST_MAX_ERRORS:
+                errors.append({'line': first_line_no + i, 'error': str(e)})
+            continue
+        row['description'] = compress_description(row['description'])
+        rows.append(row)
+    return rows, received, rejected, errors
+
+
+async def _prepare_in_pool(lines: List[bytes], first_line_no: int):
+    """Prepare a batch of lines in parallel across the worker processes."""
+    parts = await run_in_process_pool(prepare_ingest_lines, lines, first_line_no)
+    rows = [r for part in parts for r in part[0]]
+    errors = [e for part in parts for e in part[3]][:INGEST_MAX_ERRORS]
+    return rows, sum(p[1] for p in parts), sum(p[2] for p in parts), errors
+
+
+async def _load_ingest_ref_cache(conn) -> dict:
+    cache = {}
+    for key, (table, id_col, name_col) in INGEST_REF_TABLES.items():
+        rows = await conn.fetch(f"SELECT {id_col} AS id, {name_col} AS name FROM {table}")
+        cache[key] = {r['name'].lower(): r['id'] for r in rows if r['name'] is not None}
+    rows = await conn.fetch("SELECT model_id, make_id, model_name FROM models")
+    cache['model'] = {(r['make_id'], r['model_name'].lower()): r['model_id'] for r in rows if r['model_name'] is not None}
+    return cache
+
+
+async def _resolve_ingest_refs(conn, rows: List[dict]) -> dict:
+    """Map reference names to ids in place, creating missing makes/models/drives/etc. in bulk.
+
+    Runs inside the batch transaction. Names missing from the cache are looked up again under
+    an advisory lock (another ingester, in this process or not, may have created them since)
+    and only the rest are inserted, so concurrent ingests never create duplicates. Returns
+    the new name -> id entries; the caller adds them to the cache once the batch commits, so
+    a rolled-back batch leaves no ids of rows that do not exist.
+    """
+    global _ingest_ref_cache, _ingest_ref_lock
+    if _ingest_ref_lock is None:
+        _ingest_ref_lock = asyncio.Lock()
+    async with _ingest_ref_lock:
+        if _ingest_ref_cache is None:
+            _ingest_ref_cache = await _load_ingest_ref_cache(conn)
+        cache = _ingest_ref_cache
+    found = {key: {} for key in (*INGEST_REF_TABLES, 'model')}
+    locked = False
+
+    async def lock():
+        nonlocal locked
+        if not locked:
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('ingest_refs'))")
+            locked = True
+
+    for key, (table, id_col, name_col) in INGEST_REF_TABLES.items():
+        ids, new_ids = cache[key], found[key]
+        missing = {}
+        for r in rows:
+            name = r[key]
+            if name is not None and name.lower() not in ids:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            await lock()
+            existing = await conn.fetch(
+                f"SELECT {id_col} AS id, lower({name_col}) AS name FROM {table} WHERE lower({name_col}) = ANY($1::text[])",
+                list(missing)
+            )
+            for e in existing:
+                new_ids.setdefault(e['name'], e['id'])
+            to_create = [name for lowered, name in missing.items() if lowered not in new_ids]
+            if to_create:
+                created = await conn.fetch(
+                    f"INSERT INTO {table} ({name_col}) SELECT unnest($1::text[]) RETURNING {id_col} AS id, {name_col} AS name",
+                    to_create
+                )
+                for c in created:
+                    new_ids[c['name'].lower()] = c['id']
+        for r in rows:
+            name = r[key]
+            r[key + '_id'] = (ids.get(name.lower()) or new_ids.get(name.lower())) if name is not None else None
+
+    models, new_models = cache['model'], found['model']
+    missing = {}
+    for r in rows:
+        if r['model'] is not None and r['make_id'] is not None:
+            k = (r['make_id'], r['model'].lower())
+            if k not in models:
+                missing.setdefault(k, (r['make_id'], r['model']))
+    if missing:
+        await lock()
+        make_ids, names = zip(*missing)
+        existing = await conn.fetch(
+            "SELECT m.model_id, m.make_id, lower(m.model_name) AS name FROM models m "
+            "JOIN unnest($1::int[], $2::text[]) AS k(make_id, name) ON m.make_id = k.make_id AND lower(m.model_name) = k.name",
+            list(make_ids), list(names)
+        )
+        for e in existing:
+            new_models.setdefault((e['make_id'], e['name']), e['model_id'])
+        to_create = [value for k, value in missing.items() if k not in new_models]
+        if to_create:
+            make_ids, names = zip(*to_create)
+            created = await conn.fetch(
+                "INSERT INTO models (make_id, model_name) SELECT * FROM unnest($1::int[], $2::text[]) "
+                "RETURNING model_id, make_id, model_name",
+                list(make_ids), list(names)
+            )
+            for c in created:
+                new_models[(c['make_id'], c['model_name'].lower())] = c['model_id']
+    for r in rows:
+        if r['model'] is not None and r['make_id'] is not None:
+            k = (r['make_id'], r['model'].lower())
+            r['model_id'] = models.get(k) or new_models.get(k)
         else:
-            yield f"data: [ERROR] Process failed with code {process.returncode}\n\n"
-    finally:
-        # Remove from active processes
-        if process_id in active_processes:
-            del active_processes[process_id]
+            r['model_id'] = None
+    return found
+
+
+def _cache_ingest_refs(found: dict):
+    for key, entries in found.items():
+        _ingest_ref_cache[key].update(entries)
+
+
+async def _ingest_batch(db_pool, lines: List[bytes], first_line_no: int, previous: Optional[asyncio.Task]) -> dict:
+    """Prepare one batch in the process pool, then COPY it into staging tables and merge with upsert.
+
+    The load waits for the previous batch so batches are applied in input order.
+    """
+    rows, received, rejected, errors = await _prepare_in_pool(lines, first_line_no)
+    stats = {'received': received, 'rejected': rejected, 'errors': errors, 'inserted': 0, 'updated': 0}
+    if previous is not None:
+        await asyncio.wait([previous])
+    if not rows:
+        return stats
+    async with db_pool.acquire() as conn:
+        # One transaction: created reference rows roll back with a failed batch
+        async with conn.transaction():
+            found = await _resolve_ingest_refs(conn, rows)
+
+            n_desc = sum(1 for r in rows if r['description'] is not None)
+            n_new_ids = sum(1 for r in rows if r['listing_id'] is None)
+            max_explicit_id = max((r['listing_id'] for r in rows if r['listing_id'] is not None), default=None)
+            if max_explicit_id is not None:
+                # Move the sequence past explicit ids first, so generated ids (in this batch or
+                # later) never collide with them and upsert over an unrelated listing
+                await conn.execute(
+                    "SELECT setval(s, $1) FROM pg_get_serial_sequence('listings', 'listing_id') s WHERE nextval(s) < $1",
+                    max_explicit_id
+                )
+            desc_ids = []
+            if n_desc:
+                desc_ids = await conn.fetchval(
+                    "SELECT array_agg(nextval(pg_get_serial_sequence('descriptions', 'description_id'))) FROM generate_series(1, $1)",
+                    n_desc
+                )
+            new_listing_ids = []
+            if n_new_ids:
+                new_listing_ids = await conn.fetchval(
+                    "SELECT array_agg(nextval(pg_get_serial_sequence('listings', 'listing_id'))) FROM generate_series(1, $1)",
+                    n_new_ids
+                )
+
+            # Keyed by vin/listing_id so the last occurrence wins within a batch;
+            # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+            description_records = []
+            cars = {}
+            listings = {}
+            desc_iter = iter(desc_ids)
+            new_id_iter = iter(new_listing_ids)
+            for r in rows:
+                description_id = None
+                if r['description'] is not None:
+                    description_id = next(desc_iter)
+                    description_records.append((description_id, r['description']))
+                cars[r['vin']] = (r['vin'], r['model_id'], r['year'], r['drive_id'], r['transmission_id'])
+                listing_id = r['listing_id'] if r['listing_id'] is not None else next(new_id_iter)
+                listings[listing_id] = (
+                    listing_id, r['price'], r['odometer'], r['vin'], r['lat'], r['lon'], r['region_id'], description_id
+                )
+
+            await conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS ingest_cars ON COMMIT DELETE ROWS AS
+                    SELECT vin_id, model_id, year, drives_id, transmission_id FROM cars WITH NO DATA;
+                CREATE TEMP TABLE IF NOT EXISTS ingest_listings ON COMMIT DELETE ROWS AS
+                    SELECT listing_id, listing_price, listing_odometer, listing_vin_id, listing_latitude,
+                           listing_longitude, listing_region_id, listing_description_id FROM listings WITH NO DATA;
+            """)
+            if description_records:
+                await conn.copy_records_to_table(
+                    'descriptions', records=description_records, columns=['description_id', 'description_text']
+                )
+            await conn.copy_records_to_table(
+                'ingest_cars', records=list(cars.values()),
+                columns=['vin_id', 'model_id', 'year', 'drives_id', 'transmission_id']
+            )
+            await conn.copy_records_to_table(
+                'ingest_listings', records=list(listings.values()),
+                columns=['listing_id', 'listing_price', 'listing_odometer', 'listing_vin_id', 'listing_latitude',
+                         'listing_longitude', 'listing_region_id', 'listing_description_id']
+            )
+            await conn.execute("""
+                INSERT INTO cars (vin_id, model_id, year, drives_id, transmission_id)
+                SELECT vin_id, model_id, year, drives_id, transmission_id FROM ingest_cars
+                ON CONFLICT (vin_id) DO UPDATE SET
+                    model_id = COALESCE(EXCLUDED.model_id, cars.model_id),
+                    year = COALESCE(EXCLUDED.year, cars.year),
+                    drives_id = COALESCE(EXCLUDED.drives_id, cars.drives_id),
+                    transmission_id = COALESCE(EXCLUDED.transmission_id, cars.transmission_id)
+            """)
+            counts = await conn.fetchrow("""
+                WITH up AS (
+                    INSERT INTO listings (listing_id, listing_price, listing_odometer, listing_vin_id, listing_latitude,
+                                          listing_longitude, listing_region_id, listing_description_id)
+                    SELECT listing_id, listing_price, listing_odometer, listing_vin_id, listing_latitude,
+                           listing_longitude, listing_region_id, listing_description_id FROM ingest_listings
+                    ON CONFLICT (listing_id) DO UPDATE SET
+                        listing_price = EXCLUDED.listing_price,
+                        listing_odometer = EXCLUDED.listing_odometer,
+                        listing_vin_id = EXCLUDED.listing_vin_id,
+                        listing_latitude = EXCLUDED.listing_latitude,
+                        listing_longitude = EXCLUDED.listing_longitude,
+                        listing_region_id = EXCLUDED.listing_region_id,
+                        listing_description_id = COALESCE(EXCLUDED.listing_description_id, listings.listing_description_id)
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT count(*) FILTER (WHERE inserted) AS inserted, count(*) FILTER (WHERE NOT inserted) AS updated FROM up
+            """)
+    _cache_ingest_refs(found)
+    stats['inserted'] = counts['inserted']
+    stats['updated'] = counts['updated']
+    return stats
+
+
+async def iter_ndjson_lines(chunks):
+    """Split an async iterator of byte chunks into lines."""
+    buf = b''
+    async for chunk in chunks:
+        buf += chunk
+        lines = buf.split(b'\n')
+        buf = lines.pop()
+        for line in lines:
+            yield line
+    if buf:
+        yield buf
+
+
+async def ingest_ndjson(db_pool, lines, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """Ingest NDJSON listings from an async iterator of lines (bytes).
+
+    Invalid lines are skipped and reported; the first few errors are returned with
+    their 1-based line numbers. At most two batches are in flight: one being
+    prepared in the process pool while the previous one loads into Postgres.
+    """
+    started = time.perf_counter()
+    stats = {'received': 0, 'inserted': 0, 'updated': 0, 'rejected': 0, 'errors': []}
+    inflight: List[asyncio.Task] = []
+
+    def merge(result):
+        for key in ('received', 'inserted', 'updated', 'rejected'):
+            stats[key] += result[key]
+        stats['errors'].extend(result['errors'][:INGEST_MAX_ERRORS - len(stats['errors'])])
+
+    async def flush(batch, first_line_no):
+        previous = inflight[-1] if inflight else None
+        inflight.append(asyncio.create_task(_ingest_batch(db_pool, batch, first_line_no, previous)))
+        while len(inflight) > 2:
+            merge(await inflight.pop(0))
+
+    batch: List[bytes] = []
+    line_no = 0
+    try:
+        async for line in lines:
+            line_no += 1
+            batch.append(line)
+            if len(batch) >= batch_size:
+                await flush(batch, line_no - len(batch) + 1)
+                batch = []
+        if batch:
+            await flush(batch, line_no - len(batch) + 1)
+        while inflight:
+            merge(await inflight.pop(0))
+    except BaseException:
+        for task in inflight:
+            task.cancel()
+        raise
+
+    # New listings (and possibly new makes/models) invalidate cached pages and reference data
+    response_cache.clear()
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round((stats['inserted'] + stats['updated']) / elapsed) if elapsed > 0 else None
+    return stats
+
+
+@app.post("/api/ingest")
+async def ingest_listings(request: Request, batch_size: int = Query(INGEST_BATCH_SIZE, ge=1, le=100000)):
+    """Bulk-load listings from an NDJSON request body (one listing object per line).
+
+    Requires INGEST_TOKEN to be configured and sent as `Authorization: Bearer <token>`.
+    """
+    require_ingest_token(request)
+    if pool is None:
+        raise db_not_ready()
+    try:
+        return await ingest_ndjson(pool, iter_ndjson_lines(request.stream()), batch_size=batch_size)
+    except asyncpg.PostgresError as e:
+        print(f"Ingest DB error: {e}", flush=True)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-# Lambda handler using Mangum
+
+# Lambda handler using Mangum. Lifespan is off, so the DB pool is created lazily by
+# lazy_db_pool_middleware on the first /api request and reused while the container stays warm.
 try:
     from mangum import Mangum
     handler = Mangum(app, lifespan="off")
@@ -935,4 +4086,8 @@ except ImportError:
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "5001"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    if WEB_WORKERS > 1:
+        # Worker processes import the app themselves, so it is passed by name
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=WEB_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
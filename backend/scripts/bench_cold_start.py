@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Measure import time and Lambda cold start of the backend.
+
+Each sample runs in a fresh interpreter (like a new Lambda container):
+  - import:  time to `import main`
+  - cold:    import + first handler invocation
+  - warm:    second invocation in the same interpreter
+
+Usage (from backend/):
+    python scripts/bench_cold_start.py [--runs 10] [--path /] [--importtime]
+
+`--path /api/makes` exercises the lazy pool init when PG* variables are set.
+Without Mangum installed the ASGI app is driven directly instead of `handler`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+
+path = sys.argv[1]
+event = {
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": path,
+    "rawQueryString": "",
+    "headers": {"host": "localhost"},
+    "requestContext": {
+        "http": {"method": "GET", "path": path, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "bench"},
+        "stage": "$default",
+    },
+    "isBase64Encoded": False,
+}
+
+class Context:
+    function_name = "bench"
+    aws_request_id = "bench"
+
+def invoke():
+    handler = getattr(main, "handler", None)
+    if handler is not None:
+        return handler(event, Context())["statusCode"]
+    # Mangum not installed: drive the ASGI app directly
+    status = {}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "headers": [(b"host", b"localhost")], "server": ("localhost", 80), "client": ("127.0.0.1", 0)}
+    asyncio.get_event_loop().run_until_complete(main.app(scope, receive, send))
+    return status.get("code")
+
+t1 = time.perf_counter()
+status = invoke()
+t_first = time.perf_counter() - t1
+t2 = time.perf_counter()
+invoke()
+t_warm = time.perf_counter() - t2
+print(json.dumps({"import": t_import, "cold": t_import + t_first, "warm": t_warm, "status": status}))
+'''
+
+
+def run_once(path: str, importtime: bool):
+    env = dict(os.environ)
+    env.setdefault("AWS_LAMBDA_FUNCTION_NAME", "bench")
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", CHILD, path]
+    proc = subprocess.run(cmd, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"benchmark child failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def top_imports(stderr: str, n: int = 15):
+    """Parse `-X importtime` output and return the slowest top-level imports (cumulative us)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented beyond the single separator space
+        if name[1:].startswith(" "):
+            continue
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--importtime", action="store_true", help="also print the slowest imports (-X importtime)")
+    args = parser.parse_args()
+
+    samples = [run_once(args.path, False)[0] for _ in range(args.runs)]
+    print(f"path={args.path} runs={args.runs} status={samples[-1]['status']}")
+    for key in ("import", "cold", "warm"):
+        values = sorted(s[key] * 1000 for s in samples)
+        p90 = values[min(len(values) - 1, int(len(values) * 0.9))]
+        print(f"{key:>7}: median {statistics.median(values):8.1f} ms   p90 {p90:8.1f} ms   min {values[0]:8.1f} ms")
+
+    if args.importtime:
+        _, stderr = run_once(args.path, True)
+        print("\nslowest top-level imports (cumulative):")
+        for cumulative_us, name in top_imports(stderr):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
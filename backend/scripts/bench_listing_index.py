@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark memory and query latency of the in-memory listing index.
+
+Builds the index from synthetic listings (no database needed) and times typical
+/api/listings filter combinations, counts, radius searches and nearest-N
+searches (run with --rows 100000 and --rows 1000000 to compare).
+
+Usage (from backend/):
+    python scripts/bench_listing_index.py [--rows 1000000] [--repeat 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def synthetic_columns(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(25, 49, n).astype(np.float32)
+    lon = rng.uniform(-124, -67, n).astype(np.float32)
+    no_coords = rng.random(n) < 0.1
+    lat[no_coords] = np.nan
+    lon[no_coords] = np.nan
+    return {
+        'ids': np.arange(1, n + 1, dtype=np.int64),
+        'price': rng.integers(1000, 80000, n).astype(np.float32),
+        'odometer': rng.integers(0, 300000, n).astype(np.float32),
+        'year': rng.integers(1990, 2025, n).astype(np.int16),
+        'make_id': rng.integers(1, 60, n).astype(np.int32),
+        'model_id': rng.integers(1, 1500, n).astype(np.int32),
+        'drive': rng.integers(1, 4, n).astype(np.int16),
+        'transmission': rng.integers(1, 3, n).astype(np.int16),
+        'lat': lat,
+        'lon': lon,
+    }
+
+
+QUERIES = {
+    'no filters (newest 50)': dict(),
+    'price + year': dict(min_price=5000, max_price=15000, min_year=2012),
+    'make + model': dict(make_id=12, model_id=345),
+    'all attribute filters': dict(min_price=5000, max_price=30000, min_year=2010, max_year=2020,
+                                  max_odometer=120000, make_id=12, drive=2, transmission=1),
+    'radius 50 mi': dict(user_lat=47.6, user_lon=-122.3, radius=50),
+    'radius 500 mi + price': dict(user_lat=39.7, user_lon=-105.0, radius=500, max_price=20000),
+    'count, price + year': dict(min_price=5000, max_price=15000, min_year=2012, count_only=True),
+}
+
+NEAREST = {
+    'nearest 50': dict(user_lat=47.6, user_lon=-122.3),
+    'nearest 50 + price': dict(user_lat=39.7, user_lon=-105.0, max_price=20000),
+    'nearest 50 + make + model': dict(user_lat=39.7, user_lon=-105.0, make_id=12, model_id=345),
+}
+
+
+def report(name: str, run, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        matches = run()
+        times.append((time.perf_counter() - t) * 1000)
+    times.sort()
+    print(f"{name:>26}: median {statistics.median(times):7.2f} ms   p95 {times[int(len(times) * 0.95) - 1]:7.2f} ms   ({matches:,} matches)")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    index = main.ListingIndex()
+    index.append(synthetic_columns(args.rows))
+    print(f"rows: {args.rows:,}")
+    t = time.perf_counter()
+    index.nearest(user_lat=0.0, user_lon=0.0, limit=1)
+    grid_ms = (time.perf_counter() - t) * 1000
+    # Includes the nearest-N grid, as in the server (built by the index refresh task)
+    print(f"memory: {index.nbytes / 2**20:.1f} MiB total, "
+          f"{index.nbytes / args.rows:.1f} bytes/listing, "
+          f"{index.nbytes / args.rows * 1e6 / 2**20:.1f} MiB per million listings")
+
+    for name, filters in QUERIES.items():
+        report(name, lambda: index.query(limit=50, **dict(filters))[0], args.repeat)
+
+    print(f"nearest-N grid build: {grid_ms:.0f} ms")
+    for name, filters in NEAREST.items():
+        report(name, lambda: len(index.nearest(limit=50, **dict(filters))[0]), args.repeat)
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Bulk-load listings from NDJSON files (one listing object per line).
+
+Uses the same pipeline as POST /api/ingest: reference names resolved through
+in-memory caches, descriptions compressed in a process pool, COPY into staging
+tables and upsert into cars/listings. DB settings come from the PG* variables
+(backend/.env is loaded).
+
+Usage (from backend/):
+    python scripts/ingest.py listings.ndjson [more.ndjson ...] [--batch-size 5000]
+    cat listings.ndjson | python scripts/ingest.py -
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+async def iter_file_lines(path: str, chunk_size: int = 1 << 20):
+    """Yield lines from a file (or stdin for '-') without blocking the event loop."""
+    f = sys.stdin.buffer if path == '-' else open(path, 'rb')
+
+    async def chunks():
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    try:
+        async for line in main.iter_ndjson_lines(chunks()):
+            yield line
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+async def run(paths, batch_size: int) -> int:
+    await main._init_db_pool_once()
+    failed = False
+    try:
+        for path in paths:
+            stats = await main.ingest_ndjson(main.pool, iter_file_lines(path), batch_size=batch_size)
+            print(json.dumps({'file': path, **stats}), flush=True)
+            failed = failed or stats['rejected'] > 0
+    finally:
+        await main.pool.close()
+    return 1 if failed else 0
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="NDJSON files, or '-' for stdin")
+    parser.add_argument('--batch-size', type=int, default=main.INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.paths, args.batch_size)))
+
+
+if __name__ == '__main__':
+    cli()
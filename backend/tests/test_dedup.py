@@ -0,0 +1,100 @@
+"""Duplicate detection helpers: VIN normalization, MinHash similarity and batch matching (no database needed).
+
+Run from backend/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+VIN = '1HGCM82633A004352'
+TEXT = ('Clean title, one owner, new tires and brakes, full service history at the dealer, '
+        'no accidents, garage kept, adult driven, non smoker, cold air conditioning, runs and drives great')
+
+
+def fingerprint(listing_id, vin=None, description=None, price=10000, odometer=50000):
+    content_hash, minhash = main.description_fingerprint(description)
+    return (listing_id, main.normalize_vin(vin), content_hash, minhash, price, odometer)
+
+
+@pytest.mark.parametrize('vin,expected', [
+    ('1hgcm82633a004352', VIN),
+    (' 1HG-CM826 33A004352 ', VIN),
+    ('1HGCM82633A00435', None),
+    ('1HGCM82633A0043521', None),
+    ('', None),
+    (None, None),
+])
+def test_normalize_vin(vin, expected):
+    assert main.normalize_vin(vin) == expected
+
+
+def test_minhash_similarity():
+    _, a = main.description_fingerprint(TEXT)
+    _, b = main.description_fingerprint(TEXT + ', call today')
+    _, c = main.description_fingerprint('Rebuilt title, needs transmission work, sold as is, cash only please')
+    assert main.minhash_similarity(a, a) == 1.0
+    assert 0.8 <= main.minhash_similarity(a, b) < 1.0
+    assert main.minhash_similarity(a, c) == 0.0
+    assert main.minhash_similarity(b'', b'') == 0.0
+
+
+def test_description_fingerprint_ignores_case_and_punctuation():
+    assert main.description_fingerprint('Runs GREAT!  No issues.') == main.description_fingerprint('runs great, no issues')
+    assert main.description_fingerprint('  ...  ') == (None, None)
+
+
+def test_duplicate_reason_same_vin():
+    old = fingerprint(1, VIN, TEXT)
+    assert main.duplicate_reason(fingerprint(2, VIN.lower(), TEXT.upper()), old, 0.9) == 'same_vin_description'
+    assert main.duplicate_reason(fingerprint(2, VIN, TEXT + ', call today'), old, 0.8) == 'same_vin_near_description'
+    # Below the threshold the near-duplicate is kept
+    assert main.duplicate_reason(fingerprint(2, VIN, TEXT + ', call today'), old, 1.0) is None
+    assert main.duplicate_reason(fingerprint(2, VIN, 'Totally different words here'), old, 0.5) is None
+    assert main.duplicate_reason(fingerprint(2, '2HGCM82633A004352', TEXT), old, 0.9) is None
+
+
+def test_duplicate_reason_without_description():
+    old = fingerprint(1, VIN)
+    assert main.duplicate_reason(fingerprint(2, VIN), old, 0.9) == 'same_vin_price_odometer'
+    assert main.duplicate_reason(fingerprint(2, VIN, price=9000), old, 0.9) is None
+    # A description on one side only falls back to price and odometer
+    assert main.duplicate_reason(fingerprint(2, VIN, TEXT), old, 0.9) == 'same_vin_price_odometer'
+
+
+def test_duplicate_reason_without_vin():
+    assert main.duplicate_reason(fingerprint(2, None, TEXT), fingerprint(1, None, TEXT), 0.9) == 'same_description'
+    assert main.duplicate_reason(fingerprint(2, None, TEXT), fingerprint(1, VIN, TEXT), 0.9) is None
+    assert main.duplicate_reason(fingerprint(2, None, TEXT + ', call today'), fingerprint(1, None, TEXT), 0.0) is None
+    assert main.duplicate_reason(fingerprint(2), fingerprint(1), 0.9) is None
+
+
+def test_find_duplicates_keeps_newest():
+    known = [fingerprint(1, VIN, TEXT), fingerprint(2, None, 'Same words in another ad')]
+    batch = [
+        fingerprint(3, VIN, TEXT + ', call today'),
+        fingerprint(4, None, 'same words in another ad'),
+        fingerprint(5, VIN, TEXT + ', call today'),
+        fingerprint(6, '2HGCM82633A004352', TEXT),
+        fingerprint(7),
+    ]
+    kept, duplicates = main.find_duplicates(batch, known, 0.8)
+    assert sorted(duplicates) == [
+        (1, 3, 'same_vin_near_description'),
+        (2, 4, 'same_description'),
+        (3, 5, 'same_vin_description'),
+    ]
+    # Listing 3 lost to 5 within the batch, so it is not stored
+    assert [fp[0] for fp in kept] == [4, 5, 6, 7]
+
+
+def test_find_duplicates_below_threshold():
+    known = [fingerprint(1, VIN, TEXT)]
+    kept, duplicates = main.find_duplicates([fingerprint(2, VIN, TEXT + ', call today')], known, 1.0)
+    assert duplicates == []
+    assert [fp[0] for fp in kept] == [2]
@@ -0,0 +1,97 @@
+"""ListingIndex.nearest against a brute-force scan (no database needed).
+
+Run from backend/:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def columns(lat, lon, seed: int = 0) -> dict:
+    n = len(lat)
+    rng = np.random.default_rng(seed)
+    return {
+        'ids': np.arange(1, n + 1, dtype=np.int64),
+        'price': rng.integers(1000, 80000, n).astype(np.float32),
+        'odometer': rng.integers(0, 300000, n).astype(np.float32),
+        'year': rng.integers(1990, 2025, n).astype(np.int16),
+        'make_id': rng.integers(1, 60, n).astype(np.int32),
+        'model_id': rng.integers(1, 1500, n).astype(np.int32),
+        'drive': rng.integers(1, 4, n).astype(np.int16),
+        'transmission': rng.integers(1, 3, n).astype(np.int16),
+        'lat': np.asarray(lat, dtype=np.float32),
+        'lon': np.asarray(lon, dtype=np.float32),
+    }
+
+
+def brute_force(index, user_lat, user_lon, limit, offset=0, radius_unit='mi', **filters):
+    cols = index.cols
+    idx = np.flatnonzero(index._mask(cols, index.alive, with_coords=True, **filters))
+    dist = index.distances(cols['lat'][idx], cols['lon'][idx], user_lat, user_lon, radius_unit)
+    order = np.lexsort((-cols['ids'][idx], dist))[offset:offset + limit]
+    return cols['ids'][idx[order]].tolist(), dist[order].tolist()
+
+
+@pytest.fixture(scope='module')
+def index():
+    rng = np.random.default_rng(1)
+    # Mid-US density, a cluster straddling the antimeridian, points near the poles and a sparse global sprinkle
+    lat = np.concatenate([rng.uniform(25, 49, 20000), rng.uniform(40, 50, 3000),
+                          rng.uniform(85, 90, 200), rng.uniform(-90, -85, 200), rng.uniform(-90, 90, 2000)])
+    lon = np.concatenate([rng.uniform(-124, -67, 20000), rng.uniform(-180, 180, 3000) % 360 * 0.01 + 178.5,
+                          rng.uniform(-180, 180, 200), rng.uniform(-180, 180, 200), rng.uniform(-180, 180, 2000)])
+    lon = (lon + 180) % 360 - 180
+    no_coords = rng.random(len(lat)) < 0.05
+    lat[no_coords] = np.nan
+    lon[no_coords] = np.nan
+    index = main.ListingIndex()
+    index.append(columns(lat, lon))
+    return index
+
+
+USERS = [
+    (45, 179.99), (45, -179.99), (45, 180), (45, -180), (44.9, 179.75), (0, 180), (-60, -180),
+    (89.9, 0), (-89.9, 90), (47.6, -122.3), (39.7, -105.0), (30, 0), (-33.9, 151.2),
+]
+
+
+@pytest.mark.parametrize('user_lat,user_lon', USERS)
+@pytest.mark.parametrize('limit,offset', [(1, 0), (20, 0), (50, 30)])
+def test_nearest_matches_brute_force(index, user_lat, user_lon, limit, offset):
+    ids, dist = index.nearest(user_lat=user_lat, user_lon=user_lon, limit=limit, offset=offset)
+    expected_ids, expected_dist = brute_force(index, user_lat, user_lon, limit, offset)
+    assert len(set(ids)) == len(ids)
+    assert ids == expected_ids
+    assert np.allclose(dist, expected_dist)
+
+
+@pytest.mark.parametrize('user_lat,user_lon', USERS)
+def test_nearest_with_filters_matches_brute_force(index, user_lat, user_lon):
+    filters = dict(min_price=20000, max_price=30000, min_year=2010)
+    ids, _ = index.nearest(user_lat=user_lat, user_lon=user_lon, limit=20, radius_unit='km', **filters)
+    assert ids == brute_force(index, user_lat, user_lon, 20, radius_unit='km', **filters)[0]
+
+
+def test_random_queries_match_brute_force(index):
+    rng = np.random.default_rng(2)
+    for user_lat, user_lon in zip(rng.uniform(-90, 90, 100), rng.uniform(-180, 180, 100)):
+        ids, _ = index.nearest(user_lat=user_lat, user_lon=user_lon, limit=10)
+        assert ids == brute_force(index, user_lat, user_lon, 10)[0]
+
+
+def test_nearest_searches_the_whole_globe():
+    # Few listings, all far away: the rings grow until they wrap all the way around
+    rng = np.random.default_rng(3)
+    index = main.ListingIndex()
+    index.append(columns(rng.uniform(-60, 60, 12), rng.uniform(-180, 180, 12)))
+    for user_lat, user_lon in [(89.9, 10), (0, 180), (-45, -179.5)]:
+        ids, _ = index.nearest(user_lat=user_lat, user_lon=user_lon, limit=20)
+        assert ids == brute_force(index, user_lat, user_lon, 20)[0]
+        assert len(ids) == 12